@@ -0,0 +1,51 @@
+from archive import archived_counts
+from cache import bump_versions
+from migrations import SUMMARY_TABLES, summary_backfill
+
+# Every query here reads the trigger-maintained summary tables (migration 7),
+# whose size depends on the number of courses/teachers/days, never on the
+# number of registrations.
+
+
+def enrollment_by_course(db):
+    return db.query('''SELECT c.id AS course_id, c.name AS course, c.fee,
+            COALESCE(s.registrations, 0) AS registrations,
+            COALESCE(s.registrations, 0) * c.fee AS revenue
+        FROM courses c LEFT JOIN registrations_by_course s ON s.course_id = c.id
+        ORDER BY registrations DESC, c.id''').astype({'fee': float, 'registrations': int, 'revenue': float})
+
+
+def teacher_load(db):
+    return db.query('''SELECT t.id AS teacher_id, t.name AS teacher, t.subject,
+            COALESCE(s.registrations, 0) AS registrations
+        FROM teachers t LEFT JOIN registrations_by_teacher s ON s.teacher_id = t.id
+        ORDER BY registrations DESC, t.id''').astype({'registrations': int})
+
+
+def daily_series(db, start=None, end=None):
+    """Registrations and revenue per registration_date within [start, end]."""
+    return db.query('''SELECT d.registration_date AS day,
+            SUM(d.registrations) AS registrations,
+            SUM(d.registrations * c.fee) AS revenue
+        FROM registrations_by_day d JOIN courses c ON c.id = d.course_id
+        WHERE d.registrations > 0
+          AND (:start IS NULL OR d.registration_date >= :start)
+          AND (:end IS NULL OR d.registration_date <= :end)
+        GROUP BY d.registration_date
+        ORDER BY d.registration_date''', {'start': start, 'end': end})
+
+
+def rebuild_summaries(db):
+    """Recount every summary table from registrations and their archives, in case they drift."""
+    archived = {table: list(archived_counts(db, keys)) for table, keys in SUMMARY_TABLES.items()}
+
+    def rebuild(conn):
+        for table, keys in SUMMARY_TABLES.items():
+            conn.execute(f"DELETE FROM {table}")
+            conn.execute(summary_backfill(table, keys))
+            names = ', '.join(keys)
+            conn.executemany(f'''INSERT INTO {table} ({names}, registrations) VALUES ({', '.join('?' * (len(keys) + 1))})
+                ON CONFLICT ({names}) DO UPDATE SET registrations = registrations + excluded.registrations''',
+                             archived[table])
+        bump_versions(conn, ('registrations',))
+    db.submit(rebuild).result()
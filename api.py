@@ -0,0 +1,250 @@
+"""Local HTTP JSON API over services.py, for machine integrations.
+
+    python api.py --port 8765        (or: python cli.py serve)
+
+Routes (TABLE is students, teachers, courses, departments or exams):
+
+    GET    /health
+    GET    /TABLE?sort=name&desc=1&limit=50&after=["Ali Khan",42]   one keyset page
+    GET    /TABLE/ID
+    POST   /TABLE                 object or array of objects   -> {"ids": [...]}
+    PATCH  /TABLE/ID              object of changed fields      -> the updated record
+    DELETE /TABLE/ID                                            -> {"deleted": n}
+    POST   /TABLE/delete          {"ids": [...]}                -> {"deleted": n}
+    POST   /registrations         object or array of objects   -> {"ids": [...]}
+    PUT    /exams/ID/grades       [{"student_id": 1, "marks": 71.5}, ...] -> {"saved": n}
+    GET    /exports/NAME?format=csv|parquet&start=YYYY-MM-DD&end=YYYY-MM-DD
+                                  a full export (see exporter.py), streamed in chunks
+
+A batch is applied in one transaction, whole or not at all; errors name the
+failing row. Concurrent clients are group-committed by the shared writer
+thread. There is no authentication, so it binds to localhost by default.
+"""
+import argparse
+import json
+import sqlite3
+from datetime import date
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlsplit
+
+from database import DB_PATH, Database
+from exporter import EXPORT_SOURCES, FORMATS, check_format, export_file, iter_csv
+from gradebook import save_exam_grades, unknown_students
+from services import Conflict, create_many, delete, entity, get, list_page, parse_rows, register_many, update
+
+HOST = '127.0.0.1'
+PORT = 8765
+MAX_BODY_BYTES = 64 * 1024 * 1024
+MAX_PAGE = 1000
+STREAM_CHUNK_BYTES = 1024 * 1024
+
+
+def _grades(db, exam_id, rows):
+    get(db, 'exams', exam_id)
+    try:
+        grades = [(int(row['student_id']), row.get('marks')) for row in rows]
+    except (KeyError, TypeError, ValueError, AttributeError):
+        raise ValueError("grades need an integer student_id and marks") from None
+    unknown = unknown_students(db, [student_id for student_id, _ in grades])
+    if unknown:
+        raise ValueError(f"unknown student id(s): {', '.join(map(str, unknown[:20]))}")
+    save_exam_grades(db, exam_id, grades)
+    return {'saved': len(grades)}
+
+
+def export(db, name, query):
+    """(mime type, file name, byte chunks) for GET /exports/NAME.
+
+    Everything that can reject the request (unknown export, format or date,
+    missing pyarrow, too many archived years) fails here, before a response
+    is started: CSV is primed with its first chunk, Parquet is spooled.
+    """
+    if name not in EXPORT_SOURCES:
+        raise LookupError(f"unknown export {name!r}")
+    source = EXPORT_SOURCES[name]
+    extension = query.get('format', ['csv'])[0].lower()
+    fmt = {ext: fmt for fmt, (ext, _) in FORMATS.items()}.get(extension, extension)
+    check_format(fmt)
+    start, end = (query.get(bound, [None])[0] for bound in ('start', 'end'))
+    for day in (start, end):
+        if day is not None:
+            date.fromisoformat(day)
+    if fmt == 'Parquet':
+        chunks = _read_file(export_file(db, source, fmt, start, end))
+    else:
+        chunks = iter_csv(db, source, start=start, end=end)
+    first = next(chunks, b'')
+    return FORMATS[fmt][1], f"{source.name}.{FORMATS[fmt][0]}", _chain(first, chunks)
+
+
+def _read_file(file):
+    with file:
+        yield from iter(lambda: file.read(STREAM_CHUNK_BYTES), b'')
+
+
+def _chain(first, chunks):
+    yield first
+    yield from chunks
+
+
+def route(db, method, parts, query, body):
+    """Dispatch one request; returns (status, JSON-able result) or raises."""
+    if parts == ['health'] and method == 'GET':
+        return 200, {'status': 'ok'}
+    if parts == ['registrations'] and method == 'POST':
+        return 201, {'ids': register_many(db, parse_rows(body()))}
+    if len(parts) == 3 and parts[0] == 'exams' and parts[2] == 'grades' and method == 'PUT':
+        return 200, _grades(db, int(parts[1]), parse_rows(body()))
+
+    if not parts:
+        raise LookupError("no such route")
+    table = entity(parts[0]).table
+    if len(parts) == 1 and method == 'GET':
+        after = query.get('after', [None])[0]
+        records, cursor = list_page(db, table, query.get('sort', ['id'])[0],
+                                    query.get('desc', ['0'])[0] in ('1', 'true'),
+                                    json.loads(after) if after else None,
+                                    min(int(query.get('limit', ['50'])[0]), MAX_PAGE))
+        return 200, {'records': records, 'next': cursor}
+    if len(parts) == 1 and method == 'POST':
+        return 201, {'ids': create_many(db, table, parse_rows(body()))}
+    if len(parts) == 2 and parts[1] == 'delete' and method == 'POST':
+        payload = json.loads(body())
+        if not isinstance(payload, dict) or not isinstance(payload.get('ids'), list):
+            raise ValueError('expected {"ids": [...]}')
+        return 200, {'deleted': delete(db, table, payload['ids'])}
+    if len(parts) == 2:
+        record_id = int(parts[1])
+        if method == 'GET':
+            return 200, get(db, table, record_id)
+        if method == 'PATCH':
+            return 200, update(db, table, record_id, json.loads(body()))
+        if method == 'DELETE':
+            return 200, {'deleted': delete(db, table, [record_id])}
+    raise LookupError("no such route")
+
+
+class ApiHandler(BaseHTTPRequestHandler):
+    db = None
+    quiet = True
+    # Keep-alive, so clients reuse one connection; without Nagle a small
+    # response is not held back waiting for the client's delayed ACK
+    protocol_version = 'HTTP/1.1'
+    disable_nagle_algorithm = True
+
+    def do_GET(self):
+        self._dispatch('GET')
+
+    def do_POST(self):
+        self._dispatch('POST')
+
+    def do_PUT(self):
+        self._dispatch('PUT')
+
+    def do_PATCH(self):
+        self._dispatch('PATCH')
+
+    def do_DELETE(self):
+        self._dispatch('DELETE')
+
+    def _body(self):
+        length = int(self.headers.get('Content-Length') or 0)
+        if length < 0:
+            # rfile.read(-1) would block until the client closes the connection
+            raise ValueError("negative Content-Length")
+        if length > MAX_BODY_BYTES:
+            raise OverflowError(f"request body over {MAX_BODY_BYTES} bytes")
+        self._body_read = True
+        return self.rfile.read(length).decode('utf-8')
+
+    def _end_headers(self):
+        # A body the route never read (it failed first, or ignores bodies) is
+        # still on the socket and would be parsed as the next keep-alive
+        # request, so such a connection is closed after this response
+        unread = self.headers.get('Content-Length', '').strip() not in ('', '0') or 'Transfer-Encoding' in self.headers
+        if unread and not self._body_read:
+            self.send_header('Connection', 'close')
+            self.close_connection = True
+        self.end_headers()
+
+    def _dispatch(self, method):
+        self._body_read = False
+        url = urlsplit(self.path)
+        parts = [part for part in url.path.split('/') if part]
+        try:
+            if method == 'GET' and len(parts) == 2 and parts[0] == 'exports':
+                return self._stream(*export(self.db, parts[1], parse_qs(url.query)))
+            status, result = route(self.db, method, parts, parse_qs(url.query), self._body)
+        except LookupError as error:
+            status, result = 404, {'error': str(error)}
+        except OverflowError as error:
+            status, result = 413, {'error': str(error)}
+        except (Conflict, sqlite3.IntegrityError) as error:
+            status, result = 409, {'error': str(error)}
+        except (ValueError, TypeError) as error:
+            # Also json.JSONDecodeError and int() of a malformed id
+            status, result = 400, {'error': str(error)}
+        except sqlite3.Error as error:
+            status, result = 500, {'error': f"database error: {error}"}
+        payload = json.dumps(result).encode('utf-8')
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(payload)))
+        self._end_headers()
+        self.wfile.write(payload)
+
+    def _stream(self, mime, filename, chunks):
+        # Chunked transfer: the export is never held whole in memory
+        self.send_response(200)
+        self.send_header('Content-Type', mime)
+        self.send_header('Content-Disposition', f'attachment; filename="{filename}"')
+        self.send_header('Transfer-Encoding', 'chunked')
+        self._end_headers()
+        try:
+            for chunk in chunks:
+                if chunk:
+                    self.wfile.write(b'%x\r\n%s\r\n' % (len(chunk), chunk))
+            self.wfile.write(b'0\r\n\r\n')
+        except (sqlite3.Error, ValueError, OSError) as error:
+            # Too late for an error status: drop the connection so the client
+            # sees a truncated body rather than a complete-looking file
+            self.log_error("export %s failed: %s", filename, error)
+            self.close_connection = True
+
+    def log_message(self, format, *args):
+        if not self.quiet:
+            super().log_message(format, *args)
+
+
+def make_server(db, host=HOST, port=PORT, quiet=True):
+    """A threaded API server bound to (host, port); port 0 picks a free one."""
+    handler = type('Handler', (ApiHandler,), {'db': db, 'quiet': quiet})
+    server = ThreadingHTTPServer((host, port), handler)
+    server.daemon_threads = True
+    return server
+
+
+def serve(db, host=HOST, port=PORT, quiet=True):
+    server = make_server(db, host, port, quiet)
+    print(f"Serving {db.path} on http://{host}:{server.server_port}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+        db.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Serve the classroom JSON API.')
+    parser.add_argument('--db', default=DB_PATH, help='database file (default: %(default)s)')
+    parser.add_argument('--host', default=HOST)
+    parser.add_argument('--port', type=int, default=PORT)
+    parser.add_argument('--verbose', action='store_true', help='log every request')
+    args = parser.parse_args()
+    serve(Database(args.db), args.host, args.port, quiet=not args.verbose)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,158 @@
+import json
+import sqlite3
+import time
+from contextlib import contextmanager
+from pathlib import Path
+
+from profiler import record
+
+ARCHIVE_BATCH = 10000
+# SQLite's default limit on attached databases per connection
+MAX_ATTACHED = 10
+ARCHIVE_COLUMNS = ('id', 'student_id', 'teacher_id', 'course_id', 'registration_date')
+ARCHIVE_INSERT = f"INSERT OR IGNORE INTO registrations VALUES ({', '.join('?' * len(ARCHIVE_COLUMNS))})"
+
+# Registrations dated before a cutoff are moved out of the live table into one
+# SQLite file per year (registrations_<year>.db in <database>_archive/).
+# Moving is not deleting: the archive_state flag (migration 11) stops the
+# stats and summary delete triggers from decrementing, so dashboard counts and
+# analytics keep covering the full history. Archives are immutable history:
+# deleting a student later only removes their live registrations.
+
+
+def archive_dir(db):
+    path = Path(db.path)
+    return path.with_name(f"{path.stem}_archive")
+
+
+def archive_file(db, year):
+    return archive_dir(db) / f"registrations_{year}.db"
+
+
+def archived_years(db):
+    """[(year, registrations)] for every archive file, oldest first."""
+    return db.fetchall('SELECT year, registrations FROM registration_archives ORDER BY year')
+
+
+def _open_archive(path):
+    conn = sqlite3.connect(path, isolation_level=None)
+    conn.execute('PRAGMA synchronous = NORMAL')
+    conn.execute('''CREATE TABLE IF NOT EXISTS registrations (
+        id INTEGER PRIMARY KEY,
+        student_id INTEGER,
+        teacher_id INTEGER,
+        course_id INTEGER,
+        registration_date TEXT
+    )''')
+    conn.execute('CREATE INDEX IF NOT EXISTS idx_registrations_date ON registrations(registration_date)')
+    return conn
+
+
+def _move(conn, year, ids):
+    # Runs on the writer: the delete leaves stats and summaries untouched
+    conn.execute('UPDATE archive_state SET moving = 1')
+    deleted = conn.execute('DELETE FROM registrations WHERE id IN (SELECT value FROM json_each(?))',
+                           (json.dumps(ids),)).rowcount
+    conn.execute('UPDATE archive_state SET moving = 0')
+    conn.execute('''INSERT INTO registration_archives (year, registrations) VALUES (?, ?)
+        ON CONFLICT (year) DO UPDATE SET registrations = registrations + excluded.registrations''', (year, deleted))
+    return deleted
+
+
+def archive_registrations(db, cutoff, batch_rows=ARCHIVE_BATCH):
+    """Move registrations dated before `cutoff` (YYYY-MM-DD) into per-year archives.
+
+    Works in batches, yielding the running number of rows moved. Each batch
+    is first committed to its archive file (INSERT OR IGNORE by id), then
+    deleted from the live table in one write transaction, so an interrupted
+    run leaves rows in both places at worst and the next run finishes the
+    move without duplicating them.
+    """
+    archive_dir(db).mkdir(exist_ok=True)
+    archives = {}
+    moved = 0
+    try:
+        while True:
+            rows = db.fetchall(f'''SELECT {', '.join(ARCHIVE_COLUMNS)} FROM registrations
+                WHERE registration_date < ? AND registration_date GLOB '[0-9][0-9][0-9][0-9]-*'
+                ORDER BY registration_date LIMIT ?''', (cutoff, batch_rows))
+            if not rows:
+                break
+            by_year = {}
+            for row in rows:
+                by_year.setdefault(int(row[4][:4]), []).append(row)
+            for year, year_rows in by_year.items():
+                if year not in archives:
+                    archives[year] = _open_archive(archive_file(db, year))
+                archive = archives[year]
+                started = time.perf_counter()
+                archive.execute('BEGIN')
+                archive.executemany(ARCHIVE_INSERT, year_rows)
+                archive.execute('COMMIT')
+                record(None, ARCHIVE_INSERT, (), time.perf_counter() - started, len(year_rows))
+                ids = [row[0] for row in year_rows]
+                moved += db.submit(lambda conn: _move(conn, year, ids)).result()
+            yield moved
+    finally:
+        for archive in archives.values():
+            archive.close()
+
+
+def archived_counts(db, keys):
+    """Archived registrations grouped by `keys`, read straight from the archive files."""
+    present = ' AND '.join(f'{key} IS NOT NULL' for key in keys)
+    names = ', '.join(keys)
+    for year, _ in archived_years(db):
+        path = archive_file(db, year)
+        if not path.exists():
+            continue
+        conn = sqlite3.connect(f"{path.resolve().as_uri()}?mode=ro", uri=True)
+        try:
+            for rows in db.iter_chunks(f'SELECT {names}, COUNT(*) FROM registrations WHERE {present} GROUP BY {names}',
+                                       conn=conn):
+                yield from rows
+        finally:
+            conn.close()
+
+
+@contextmanager
+def history(db, start=None, end=None):
+    """A read-only connection with a TEMP VIEW registrations_history.
+
+    The view is the live table UNION ALL the archive years that overlap
+    [start, end] (all of them when open-ended), so callers filter history
+    exactly as they would filter registrations.
+    """
+    first = int(start[:4]) if start else None
+    last = int(end[:4]) if end else None
+    years = [year for year, _ in archived_years(db)
+             if (first is None or year >= first) and (last is None or year <= last)
+             and archive_file(db, year).exists()]
+    if len(years) > MAX_ATTACHED:
+        raise ValueError(f"That range spans {len(years)} archived years; narrow it to {MAX_ATTACHED} or fewer.")
+    conn = db.open_reader()
+    try:
+        columns = ', '.join(ARCHIVE_COLUMNS)
+        selects = [f'SELECT {columns} FROM main.registrations']
+        for year in years:
+            conn.execute(f"ATTACH DATABASE ? AS archive_{year}",
+                         (f"{archive_file(db, year).resolve().as_uri()}?mode=ro",))
+            selects.append(f'SELECT {columns} FROM archive_{year}.registrations')
+        conn.execute(f"CREATE TEMP VIEW registrations_history AS {' UNION ALL '.join(selects)}")
+        yield conn
+    finally:
+        conn.close()
+
+
+def registration_history(db, start=None, end=None, limit=500):
+    """Registrations in [start, end] from the live table and the archives, newest first."""
+    with history(db, start, end) as conn:
+        return db.query('''SELECT r.id, r.registration_date, s.name AS student, t.name AS teacher, c.name AS course
+            FROM registrations_history r
+            LEFT JOIN students s ON s.id = r.student_id
+            LEFT JOIN teachers t ON t.id = r.teacher_id
+            LEFT JOIN courses c ON c.id = r.course_id
+            WHERE (:start IS NULL OR r.registration_date >= :start)
+              AND (:end IS NULL OR r.registration_date <= :end)
+            ORDER BY r.registration_date DESC, r.id DESC LIMIT :limit''',
+                        {'start': start, 'end': end, 'limit': limit}, conn)
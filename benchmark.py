@@ -0,0 +1,164 @@
+"""Headless benchmark of every page and tab of the app.
+
+    python seed.py --db bench.db --students 1000000 --registrations 5000000
+    python benchmark.py --db bench.db --save-baseline    # on the reference build
+    python benchmark.py --db bench.db                    # later: compare
+
+Each scenario opens a page (and section) in Streamlit's AppTest, then times
+`--reruns` further reruns of the script - what a user waits for after every
+click. It reports p50/p95/p99 rerun latency, peak Python memory during one
+rerun (tracemalloc) and SQL statements per rerun, and compares them against
+the stored baseline, exiting non-zero when a scenario has regressed.
+"""
+import argparse
+import json
+import os
+import statistics
+import sys
+import time
+import tracemalloc
+from pathlib import Path
+
+APP = Path(__file__).with_name('streamlit_app.py')
+BASELINE = Path(__file__).with_name('benchmark_baseline.json')
+METRICS = ('p50_ms', 'p95_ms', 'p99_ms', 'peak_mib', 'queries')
+
+# (page, section radio key, section) - None runs the page as it opens
+SCENARIOS = [('Dashboard', None, None)] + [
+    (page, f'{table}_section', section)
+    for page, table, sections in [
+        ('Students', 'students', ['📋 View', '➕ Add', '✏️ Update', '🔍 Search', '🗑️ Delete', '📥 Import']),
+        ('Teachers', 'teachers', ['📋 View', '➕ Add', '✏️ Update', '🔍 Search', '🗑️ Delete', '📥 Import']),
+        ('Courses', 'courses', ['📋 View', '➕ Add', '✏️ Update', '🔍 Search', '🗑️ Delete', '📥 Import']),
+        ('Departments', 'departments', ['📋 View', '➕ Add', '✏️ Update', '🔍 Search', '🗑️ Delete']),
+        ('Exams', 'exams', ['📋 View', '➕ Add', '✏️ Update', '🔍 Search', '🗑️ Delete', '🗓️ Timetable']),
+        ('Gradebook', 'gradebook', ['✍️ Enter Grades', '📊 Exam Results', '🎓 Cohort GPA']),
+    ]
+    for section in sections
+] + [('Registration Form', None, None), ('Registrations', None, None), ('Data Export', None, None)]
+
+
+class StatementCounter:
+    """Counts SQL statements run on every connection the app opens."""
+
+    def __init__(self):
+        self.count = 0
+
+    def __call__(self, sql):
+        # Statements run by triggers arrive as '-- <sql>' and are not counted
+        if not sql.startswith('--'):
+            self.count += 1
+
+    def install(self, database):
+        connect = database.Database._connect
+
+        def traced(target, uri=False):
+            conn = connect(target, uri)
+            conn.set_trace_callback(self)
+            return conn
+        database.Database._connect = staticmethod(traced)
+
+
+def percentile(samples, q):
+    ordered = sorted(samples)
+    return ordered[min(len(ordered) - 1, round(q / 100 * (len(ordered) - 1)))]
+
+
+def run_scenario(page, section_key, section, reruns, counter):
+    from streamlit.testing.v1 import AppTest
+
+    at = AppTest.from_file(str(APP), default_timeout=600)
+    at.run()
+    at.sidebar.radio[0].set_value(page).run()
+    if section_key:
+        at.radio(key=section_key).set_value(section).run()
+    if at.exception:
+        raise RuntimeError(f"{page} / {section}: {at.exception[0].message}")
+
+    at.run()   # warm-up: first render of this exact view
+    timings = []
+    queries = counter.count
+    for _ in range(reruns):
+        started = time.perf_counter()
+        at.run()
+        timings.append((time.perf_counter() - started) * 1000)
+    queries = (counter.count - queries) / reruns
+
+    tracemalloc.start()
+    at.run()
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return {
+        'p50_ms': statistics.median(timings),
+        'p95_ms': percentile(timings, 95),
+        'p99_ms': percentile(timings, 99),
+        'peak_mib': peak / 2 ** 20,
+        'queries': queries,
+    }
+
+
+def compare(results, baseline, tolerance):
+    """Print each scenario against the baseline; return the regressed scenario names."""
+    regressed = []
+    print(f"\n{'scenario':<40}" + ''.join(f"{metric:>18}" for metric in METRICS))
+    for name, result in results.items():
+        before = baseline.get(name, {})
+        cells, worse = [], False
+        for metric in METRICS:
+            value = result[metric]
+            if metric not in before:
+                cells.append(f"{value:9.1f}        ")
+                continue
+            # Latency and memory are noisy; query counts must not grow at all.
+            # p99 over a few reruns is a single sample, so it is shown only.
+            if metric == 'queries':
+                worse |= value > before[metric]
+            elif metric != 'p99_ms':
+                worse |= value > before[metric] * (1 + tolerance)
+            change = (value - before[metric]) / before[metric] if before[metric] else 0.0
+            cells.append(f"{value:9.1f} ({change:+5.0%})")
+        if worse:
+            regressed.append(name)
+        print(f"{name:<40}" + ''.join(f"{cell:>18}" for cell in cells) + ('  << REGRESSED' if worse else ''))
+    return regressed
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark every page and tab of the app headlessly.')
+    parser.add_argument('--db', required=True, help='database to benchmark against (see seed.py)')
+    parser.add_argument('--reruns', type=int, default=20, help='timed reruns per scenario')
+    parser.add_argument('--baseline', type=Path, default=BASELINE)
+    parser.add_argument('--save-baseline', action='store_true', help='store these results as the new baseline')
+    parser.add_argument('--tolerance', type=float, default=0.25,
+                        help='allowed fractional slowdown of p50/p95/memory (default: %(default)s)')
+    parser.add_argument('--only', help='run only scenarios whose name contains this text')
+    args = parser.parse_args()
+
+    # The app reads CLASSROOM_DB when it first imports database
+    os.environ['CLASSROOM_DB'] = str(Path(args.db).resolve())
+    sys.path.insert(0, str(APP.parent))
+    import database
+
+    counter = StatementCounter()
+    counter.install(database)
+
+    results = {}
+    for page, section_key, section in SCENARIOS:
+        name = f"{page} / {section}" if section else page
+        if args.only and args.only.lower() not in name.lower():
+            continue
+        print(f"running {name}…", file=sys.stderr)
+        results[name] = run_scenario(page, section_key, section, args.reruns, counter)
+
+    baseline = json.loads(args.baseline.read_text()) if args.baseline.exists() else {}
+    regressed = compare(results, baseline, args.tolerance)
+    if args.save_baseline:
+        args.baseline.write_text(json.dumps({**baseline, **results}, indent=2, ensure_ascii=False) + '\n')
+        print(f"\nBaseline saved to {args.baseline}")
+    elif regressed:
+        print(f"\n{len(regressed)} scenario(s) regressed beyond the baseline")
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
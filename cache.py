@@ -0,0 +1,82 @@
+import threading
+from collections import OrderedDict
+from functools import wraps
+
+CACHE_ENTRIES = 256
+
+
+def bump_versions(conn, tables):
+    """Invalidate cached reads of `tables` after rewriting data derived from them."""
+    conn.executemany('UPDATE table_versions SET version = version + 1 WHERE name = ?',
+                     [(table,) for table in tables])
+
+
+class QueryCache:
+    """LRU cache of query results that stay valid until their tables change.
+
+    Every insert, update or delete bumps its table's row in table_versions
+    (triggers, migration 10), whichever session, replica or process made
+    it. Each result is stored with the versions of the tables it was read
+    from and is served until one of them moves on.
+
+    Finding out whether anything moved is a PRAGMA data_version on a
+    dedicated connection, which changes only when another connection has
+    committed; table_versions is re-read just then. Repeated reads of
+    unchanged tables therefore never touch a table page.
+
+    Cached results are shared between sessions, so callers must not
+    modify them in place.
+    """
+
+    def __init__(self, connect, max_entries=CACHE_ENTRIES):
+        self.max_entries = max_entries
+        self.hits = self.misses = 0
+        self._watcher = connect()
+        self._data_version = None
+        self._versions = {}
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def versions(self):
+        with self._lock:
+            data_version = self._watcher.execute('PRAGMA data_version').fetchone()[0]
+            if data_version != self._data_version:
+                # A commit landing between these two reads only makes the
+                # next call re-read again, never serves stale versions.
+                self._versions = dict(self._watcher.execute('SELECT name, version FROM table_versions'))
+                self._data_version = data_version
+            return self._versions
+
+    def get(self, key, tables, load):
+        """Return the cached result for `key`, calling load() if `tables` changed since."""
+        # Versions are read before loading, so a write racing with load()
+        # leaves the entry looking older than its data and it is re-read.
+        versions = self.versions()
+        generation = tuple(versions.get(table, 0) for table in tables)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry[0] == generation:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return entry[1]
+            self.misses += 1
+        result = load()
+        with self._lock:
+            self._entries[key] = (generation, result)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+        return result
+
+    def memoize(self, *tables):
+        """Decorator caching a function's result per argument tuple until `tables` change."""
+        def decorate(func):
+            @wraps(func)
+            def cached(*args):
+                return self.get((func.__module__, func.__qualname__) + args, tables, lambda: func(*args))
+            return cached
+        return decorate
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
@@ -0,0 +1,140 @@
+"""Command-line access to the classroom database, without the Streamlit UI.
+
+    python cli.py list students --sort name --limit 20
+    python cli.py get students 42
+    python cli.py create teachers rows.json        # JSON array, object or JSON lines; '-' for stdin
+    python cli.py update courses 7 '{"fee": 250}'
+    python cli.py delete students 3 4 5
+    python cli.py register registrations.jsonl
+    python cli.py import students students.csv     # CSV/Excel, same checks as the Import tab
+    python cli.py archive 2024-01-01               # move older registrations to per-year archives
+    python cli.py reindex                          # rebuild the search index (e.g. after restoring a backup)
+    python cli.py serve --port 8765                # HTTP JSON API (see api.py)
+
+Results are printed as JSON; errors go to stderr with a non-zero exit code.
+"""
+import argparse
+import json
+import sqlite3
+import sys
+from datetime import date
+
+from archive import ARCHIVE_BATCH, archive_registrations, archived_years
+from database import DB_PATH, Database
+from entities import ENTITIES
+from importer import IMPORT_SPECS, import_file
+from migrations import SEARCH_COLUMNS
+from search import rebuild_search_index
+from services import Conflict, create_many, delete, get, list_page, parse_rows, register_many, update
+
+
+def _read(source):
+    if source == '-':
+        return sys.stdin.read()
+    with open(source, encoding='utf-8') as file:
+        return file.read()
+
+
+def _positive(text):
+    value = int(text)
+    if value < 1:
+        raise argparse.ArgumentTypeError("must be at least 1")
+    return value
+
+
+def _import(db, args):
+    with open(args.file, 'rb') as file:
+        for report in import_file(db, args.table, file, args.file):
+            print(f"\r{report.processed:,} rows, {report.inserted:,} inserted, {report.failed:,} failed "
+                  f"({report.rows_per_second:,.0f} rows/s)", end='', file=sys.stderr, flush=True)
+    print(file=sys.stderr)
+    return {'processed': report.processed, 'inserted': report.inserted, 'failed': report.failed,
+            'errors': report.errors[:100]}
+
+
+def _archive(db, args):
+    moved = 0
+    for moved in archive_registrations(db, args.cutoff, args.batch):
+        print(f"\r{moved:,} registrations archived", end='', file=sys.stderr, flush=True)
+    print(file=sys.stderr)
+    return {'archived': moved, 'years': dict(archived_years(db))}
+
+
+COMMANDS = {
+    'list': lambda db, args: dict(zip(('records', 'next'), list_page(
+        db, args.table, args.sort, args.desc, json.loads(args.after) if args.after else None, args.limit))),
+    'get': lambda db, args: get(db, args.table, args.id),
+    'create': lambda db, args: {'ids': create_many(db, args.table, parse_rows(_read(args.file)))},
+    'update': lambda db, args: update(db, args.table, args.id, json.loads(args.changes)),
+    'delete': lambda db, args: {'deleted': delete(db, args.table, args.ids)},
+    'register': lambda db, args: {'ids': register_many(db, parse_rows(_read(args.file)))},
+    'import': _import,
+    'archive': _archive,
+    'reindex': lambda db, args: rebuild_search_index(db) or {'reindexed': sorted(SEARCH_COLUMNS)},
+}
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Classroom database from the command line.')
+    parser.add_argument('--db', default=DB_PATH, help='database file (default: %(default)s)')
+    commands = parser.add_subparsers(dest='command', required=True)
+    tables = sorted(ENTITIES)
+
+    command = commands.add_parser('list', help='one page of records, in keyset order')
+    command.add_argument('table', choices=tables)
+    command.add_argument('--sort', default='id')
+    command.add_argument('--desc', action='store_true')
+    command.add_argument('--after', help='the "next" cursor printed by the previous page, as JSON')
+    command.add_argument('--limit', type=_positive, default=50)
+
+    command = commands.add_parser('get', help='one record by id')
+    command.add_argument('table', choices=tables)
+    command.add_argument('id', type=int)
+
+    command = commands.add_parser('create', help='insert records from JSON, in one transaction')
+    command.add_argument('table', choices=tables)
+    command.add_argument('file', help="JSON array/object or JSON lines; '-' reads stdin")
+
+    command = commands.add_parser('update', help='change fields of one record')
+    command.add_argument('table', choices=tables)
+    command.add_argument('id', type=int)
+    command.add_argument('changes', help='JSON object of the fields to change')
+
+    command = commands.add_parser('delete', help='delete records (and their dependants) by id')
+    command.add_argument('table', choices=tables)
+    command.add_argument('ids', type=int, nargs='+')
+
+    command = commands.add_parser('register', help='register students from JSON, in one transaction')
+    command.add_argument('file', help="objects with student_id, teacher_id, course_id[, registration_date]; '-' reads stdin")
+
+    command = commands.add_parser('import', help='bulk import a CSV/Excel file')
+    command.add_argument('table', choices=sorted(IMPORT_SPECS))
+    command.add_argument('file')
+
+    command = commands.add_parser('archive', help='move registrations dated before a cutoff into per-year archive files')
+    command.add_argument('cutoff', type=lambda text: date.fromisoformat(text).isoformat(), help='YYYY-MM-DD')
+    command.add_argument('--batch', type=int, default=ARCHIVE_BATCH, help='rows per transaction (default: %(default)s)')
+
+    commands.add_parser('reindex', help='rebuild the full-text search index from the tables')
+
+    command = commands.add_parser('serve', help='run the HTTP JSON API')
+    command.add_argument('--host', default='127.0.0.1')
+    command.add_argument('--port', type=int, default=8765)
+    command.add_argument('--verbose', action='store_true', help='log every request')
+
+    args = parser.parse_args(argv)
+    db = Database(args.db)
+    if args.command == 'serve':
+        from api import serve
+        return serve(db, args.host, args.port, quiet=not args.verbose)
+    try:
+        print(json.dumps(COMMANDS[args.command](db, args), indent=2, default=str))
+    except (LookupError, ValueError, Conflict, sqlite3.Error, OSError) as error:
+        print(f"error: {error}", file=sys.stderr)
+        return 1
+    finally:
+        db.close()
+
+
+if __name__ == '__main__':
+    sys.exit(main())
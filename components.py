@@ -0,0 +1,213 @@
+import pandas as pd
+import streamlit as st
+
+from importer import IMPORT_SPECS, import_file
+from profiler import SLOW_QUERY_MS, set_section
+from queries import delete_records, describe, fetch_page
+from search import search
+from stats import table_count
+
+PAGE_SIZES = [25, 50, 100, 250]
+
+VIEW, ADD, UPDATE, SEARCH, DELETE = "📋 View", "➕ Add", "✏️ Update", "🔍 Search", "🗑️ Delete"
+SECTIONS = [VIEW, ADD, UPDATE, SEARCH, DELETE]
+IMPORT = "📥 Import"
+TIMETABLE = "🗓️ Timetable"
+
+
+def _scalar(value):
+    # numpy scalars -> plain Python values so sqlite3 can bind them
+    return value.item() if hasattr(value, 'item') else value
+
+
+# ======================= SECTION TABS =======================
+def section_tabs(sections, key):
+    """Tab-like section switcher that returns the active section.
+
+    Unlike st.tabs, which executes the body of every tab on each rerun, the
+    caller only renders (and queries for) the section that is returned.
+    """
+    section = st.radio("Section", sections, horizontal=True, key=key, label_visibility="collapsed")
+    set_section(section)
+    return section
+
+
+# ======================= PAGINATED TABLE =======================
+def paginated_table(db, entity, key):
+    """Render one page of `entity` with keyset navigation.
+
+    Only `page_size` rows are ever read, so memory per session stays flat
+    however large the table grows. The stack of page-start cursors lives in
+    session_state and is reset whenever the sort order or page size changes.
+    """
+    col1, col2, col3 = st.columns([2, 1, 1])
+    with col1:
+        sort = st.selectbox("Sort by", entity.sort_columns, key=f"{key}_sort")
+    with col2:
+        descending = st.toggle("Descending", key=f"{key}_desc")
+    with col3:
+        page_size = st.selectbox("Rows per page", PAGE_SIZES, index=1, key=f"{key}_size")
+
+    state_key = f"{key}_pages"
+    ordering = (sort, descending, page_size)
+    if st.session_state.get(f"{state_key}_order") != ordering:
+        st.session_state[f"{state_key}_order"] = ordering
+        st.session_state[state_key] = [None]
+    cursors = st.session_state[state_key]
+
+    # One extra row tells us whether a next page exists without counting.
+    df = db.cache.get(('page', entity.table, sort, descending, cursors[-1], page_size + 1), (entity.table,),
+                      lambda: fetch_page(db, entity, sort, descending, cursors[-1], page_size + 1))
+    has_next = len(df) > page_size
+    df = df.head(page_size)
+    st.dataframe(df, use_container_width=True, hide_index=True)
+
+    total = db.cache.get(('count', entity.table), (entity.table,), lambda: table_count(db, entity.table))
+    pages = max(1, -(-total // page_size))
+    next_cursor = (_scalar(df[sort].iloc[-1]), _scalar(df['id'].iloc[-1])) if has_next else None
+
+    col1, col2, col3 = st.columns([1, 2, 1])
+    with col1:
+        st.button("◀ Previous", key=f"{key}_prev", disabled=len(cursors) == 1,
+                  on_click=lambda: cursors.pop(), use_container_width=True)
+    with col2:
+        st.caption(f"Page {len(cursors)} of {pages} · {total} {entity.label.lower()} records")
+    with col3:
+        st.button("Next ▶", key=f"{key}_next", disabled=not has_next,
+                  on_click=lambda: cursors.append(next_cursor), use_container_width=True)
+
+
+# ======================= SEARCH RESULTS =======================
+def search_table(db, entity, label, key, page_size=25):
+    """Full-text search box with ranked, paged results."""
+    term = st.text_input(label, key=f"{key}_term")
+    if not term:
+        return
+    offset_key = f"{key}_offset"
+    if st.session_state.get(f"{offset_key}_term") != term:
+        st.session_state[f"{offset_key}_term"] = term
+        st.session_state[offset_key] = 0
+    offset = st.session_state[offset_key]
+
+    df = db.cache.get(('search', entity.table, term, page_size + 1, offset), (entity.table,),
+                      lambda: search(db, entity, term, page_size + 1, offset))
+    has_next = len(df) > page_size
+    if df.empty:
+        st.info("No matches found.")
+        return
+    st.dataframe(df.head(page_size), use_container_width=True, hide_index=True)
+
+    def move(step):
+        st.session_state[offset_key] = max(0, offset + step)
+
+    col1, col2, col3 = st.columns([1, 2, 1])
+    with col1:
+        st.button("◀ Previous", key=f"{key}_prev", disabled=offset == 0,
+                  on_click=move, args=(-page_size,), use_container_width=True)
+    with col2:
+        st.caption(f"Results {offset + 1}–{offset + min(len(df), page_size)}")
+    with col3:
+        st.button("Next ▶", key=f"{key}_next", disabled=not has_next,
+                  on_click=move, args=(page_size,), use_container_width=True)
+
+
+# ======================= ENTITY PICKER =======================
+def entity_picker(db, entity, label, key, limit=20):
+    """Search-as-you-type picker that returns the chosen row's id (or None).
+
+    Each rerun reads at most `limit` rows from the FTS index (or the newest
+    rows when nothing is typed), so it stays fast on very large tables and
+    never confuses two records that share a name.
+    """
+    term = st.text_input(label, key=f"{key}_term", placeholder=f"Type to search {entity.label.lower()}s…")
+    if term.strip():
+        df = db.cache.get(('search', entity.table, term, limit, 0), (entity.table,),
+                          lambda: search(db, entity, term, limit))
+    else:
+        df = db.cache.get(('page', entity.table, 'id', True, None, limit), (entity.table,),
+                          lambda: fetch_page(db, entity, 'id', True, None, limit))
+    if df.empty:
+        st.info(f"No matching {entity.label.lower()}s.")
+        return None
+    labels = {record['id']: describe(entity, record) for record in df.to_dict('records')}
+    return st.selectbox(f"Matching {entity.label.lower()}s", list(labels), format_func=labels.get,
+                        key=f"{key}_id", label_visibility="collapsed")
+
+
+# ======================= BULK IMPORT =======================
+def import_panel(db, table, key):
+    """Upload a CSV/Excel file and load it in validated, batched chunks."""
+    spec = IMPORT_SPECS[table]
+    st.caption(f"Required columns: {', '.join(spec.required)}"
+               + (f" · Optional: {', '.join(spec.optional)}" if spec.optional else ""))
+    upload = st.file_uploader("CSV or Excel file", type=["csv", "xlsx"], key=f"{key}_file")
+    if not upload or not st.button("📥 Start Import", key=f"{key}_start"):
+        return
+
+    status = st.empty()
+    report = None
+    try:
+        for report in import_file(db, table, upload, upload.name):
+            status.caption(f"{report.processed:,} rows processed · {report.rows_per_second:,.0f} rows/s")
+    except ValueError as error:
+        st.error(str(error))
+        return
+    if report is None:
+        st.warning("The file has no data rows.")
+        return
+
+    col1, col2, col3, col4 = st.columns(4)
+    col1.metric("Rows processed", f"{report.processed:,}")
+    col2.metric("Imported", f"{report.inserted:,}")
+    col3.metric("Rejected", f"{report.failed:,}")
+    col4.metric("Rows / second", f"{report.rows_per_second:,.0f}")
+    if report.errors:
+        st.dataframe(pd.DataFrame(report.errors, columns=["Row", "Error"]), use_container_width=True, hide_index=True)
+        if report.failed > len(report.errors):
+            st.caption(f"Showing the first {len(report.errors):,} of {report.failed:,} rejected rows.")
+
+
+# ======================= BULK DELETE =======================
+def bulk_delete_panel(db, entity, key, limit=500):
+    """Select many rows from a search and delete them in one transaction.
+
+    Returns the number of rows deleted, or None if nothing was deleted.
+    """
+    term = st.text_input(f"Find {entity.label.lower()}s to delete", key=f"{key}_term")
+    if not term.strip():
+        return None
+    df = search(db, entity, term, limit)
+    if df.empty:
+        st.info(f"No matching {entity.label.lower()}s.")
+        return None
+    labels = {record['id']: describe(entity, record) for record in df.to_dict('records')}
+    if len(labels) == limit:
+        st.caption(f"Showing the first {limit} matches; refine the search to reach the rest.")
+    if st.checkbox(f"Select all {len(labels)} matches", key=f"{key}_all"):
+        chosen = list(labels)
+    else:
+        chosen = st.multiselect("Selected", list(labels), format_func=labels.get, key=f"{key}_ids")
+    if chosen and st.button(f"🛑 Delete {len(chosen)} selected", type="primary", key=f"{key}_go"):
+        return delete_records(db, entity, chosen)
+    return None
+
+
+# ======================= QUERY PROFILER =======================
+def query_profile_panel(rerun):
+    """Sidebar breakdown of the statements run by the current rerun, slowest first."""
+    with st.sidebar.expander(f"🔬 {len(rerun.statements)} queries · {rerun.total_ms:.1f} ms", expanded=True):
+        st.caption(rerun.location)
+        if not rerun.statements:
+            st.caption("No database access on this rerun (cached or static).")
+            return
+        df = pd.DataFrame([{
+            'ms': round(statement.ms, 2),
+            'rows': statement.rows,
+            'sql': statement.sql,
+            'plan': ' | '.join(statement.plan or ()),
+        } for statement in sorted(rerun.statements, key=lambda statement: -statement.ms)])
+        st.dataframe(df, use_container_width=True, hide_index=True)
+        scans = [statement for statement in rerun.statements if statement.full_scan]
+        if scans:
+            st.warning(f"{len(scans)} slow statement(s) scan a whole table.")
+        st.caption(f"Plans are captured for statements over {SLOW_QUERY_MS:g} ms and written to the slow-query log.")
@@ -0,0 +1,264 @@
+import os
+import queue
+import sqlite3
+import threading
+import time
+from concurrent.futures import Future
+from contextlib import contextmanager, nullcontext
+from pathlib import Path
+
+import pandas as pd
+
+from cache import QueryCache
+from migrations import migrate
+from profiler import current_rerun, record
+
+# ======================= SETTINGS =======================
+# Every replica on a host should point CLASSROOM_DB at the same file; WAL mode
+# plus busy timeouts let them share it safely.
+DB_PATH = os.environ.get('CLASSROOM_DB', str(Path(__file__).with_name('classroom.db')))
+READERS = int(os.environ.get('CLASSROOM_DB_READERS', '4'))
+BUSY_TIMEOUT_MS = int(os.environ.get('CLASSROOM_DB_BUSY_TIMEOUT_MS', '5000'))
+CACHE_SIZE_KIB = 64 * 1024
+BUSY_RETRIES = 5
+WRITE_BATCH = 500
+
+SQLITE_BUSY = 5
+SQLITE_LOCKED = 6
+
+
+def is_busy(error):
+    code = getattr(error, 'sqlite_errorcode', None)
+    if code is not None:
+        return code & 0xFF in (SQLITE_BUSY, SQLITE_LOCKED)
+    return 'locked' in str(error) or 'busy' in str(error)
+
+
+def retry_busy(func):
+    """Call func(), backing off and retrying while SQLite reports SQLITE_BUSY."""
+    for attempt in range(BUSY_RETRIES):
+        try:
+            return func()
+        except sqlite3.OperationalError as error:
+            if not is_busy(error) or attempt == BUSY_RETRIES - 1:
+                raise
+            time.sleep(0.05 * 2 ** attempt)
+
+
+# ======================= CONNECTION MANAGER =======================
+class Database:
+    """One writer connection plus a bounded pool of read-only connections.
+
+    Writes are funnelled through a single background thread that
+    group-commits whatever has queued up (see submit); `cache` holds read
+    results until the tables behind them change.
+    """
+
+    def __init__(self, path=DB_PATH, readers=READERS):
+        self.path = str(path)
+        self._writer = self._connect(self.path)
+        self._writer.execute('PRAGMA journal_mode = WAL')
+        migrate(self._writer)
+        self._write_lock = threading.RLock()
+        self._readers = queue.LifoQueue()
+        self._reader_slots = threading.BoundedSemaphore(readers)
+        self._reader_uri = Path(self.path).resolve().as_uri() + '?mode=ro'
+        self.cache = QueryCache(self.open_reader)
+        self._owner = None
+        self._writes = queue.SimpleQueue()
+        self._writer_thread = threading.Thread(target=self._write_loop, name='db-writer', daemon=True)
+        self._writer_thread.start()
+
+    @staticmethod
+    def _connect(target, uri=False):
+        conn = sqlite3.connect(target, uri=uri, check_same_thread=False, isolation_level=None)
+        conn.execute(f'PRAGMA busy_timeout = {BUSY_TIMEOUT_MS}')
+        conn.execute('PRAGMA foreign_keys = ON')
+        conn.execute('PRAGMA synchronous = NORMAL')
+        conn.execute(f'PRAGMA cache_size = -{CACHE_SIZE_KIB}')
+        return conn
+
+    def open_reader(self):
+        """A read-only connection outside the pool; the caller closes it."""
+        return self._connect(self._reader_uri, uri=True)
+
+    @contextmanager
+    def reader(self):
+        with self._reader_slots:
+            try:
+                conn = self._readers.get_nowait()
+            except queue.Empty:
+                conn = self.open_reader()
+            try:
+                yield conn
+            finally:
+                self._readers.put(conn)
+
+    @contextmanager
+    def transaction(self):
+        """Serialise writers; nested calls join the outer transaction."""
+        with self._write_lock:
+            if self._writer.in_transaction:
+                yield self._writer
+                return
+            retry_busy(lambda: self._writer.execute('BEGIN IMMEDIATE'))
+            self._owner = threading.get_ident()
+            try:
+                yield self._writer
+                retry_busy(lambda: self._writer.execute('COMMIT'))
+            except BaseException:
+                if self._writer.in_transaction:
+                    self._writer.execute('ROLLBACK')
+                raise
+            finally:
+                self._owner = None
+
+    # ----- reads -----
+    # Every read goes through _read or iter_chunks, so the profiler sees it.
+    # `conn` runs the statement on a connection the caller opened (e.g.
+    # archive.history's, with archives attached) instead of a pooled reader.
+    def _read(self, sql, params, run, count, conn=None):
+        # Timed from execute to the last row fetched, so the profiler sees
+        # the real cost of the statement rather than its first step.
+        with nullcontext(conn) if conn is not None else self.reader() as conn:
+            started = time.perf_counter()
+            result = retry_busy(lambda: run(conn))
+            record(conn, sql, params, time.perf_counter() - started, count(result))
+            return result
+
+    def query(self, sql, params=(), conn=None):
+        return self._read(sql, params, lambda conn: pd.read_sql(sql, conn, params=params), len, conn)
+
+    def fetchone(self, sql, params=(), conn=None):
+        return self._read(sql, params, lambda conn: conn.execute(sql, params).fetchone(),
+                          lambda row: int(row is not None), conn)
+
+    def fetchall(self, sql, params=(), conn=None):
+        return self._read(sql, params, lambda conn: conn.execute(sql, params).fetchall(), len, conn)
+
+    def scalar(self, sql, params=(), conn=None):
+        row = self.fetchone(sql, params, conn)
+        return row[0] if row else None
+
+    def iter_chunks(self, sql, params=(), chunk_rows=1000, conn=None):
+        """Yield the rows of one statement in lists of at most `chunk_rows`.
+
+        Recorded once the rows run out (or the caller stops early); only the
+        time spent in SQLite counts, not the caller's work between chunks.
+        """
+        with nullcontext(conn) if conn is not None else self.reader() as conn:
+            rows = 0
+            started = time.perf_counter()
+            cursor = retry_busy(lambda: conn.execute(sql, params))
+            elapsed = time.perf_counter() - started
+            try:
+                while True:
+                    started = time.perf_counter()
+                    chunk = cursor.fetchmany(chunk_rows)
+                    elapsed += time.perf_counter() - started
+                    if not chunk:
+                        break
+                    rows += len(chunk)
+                    yield chunk
+            finally:
+                cursor.close()
+                record(conn, sql, params, elapsed, rows)
+
+    # ----- writes -----
+    def submit(self, work, params=()):
+        """Queue a write for the background writer and return its Future.
+
+        `work` is either an SQL statement (the result is its cursor) or a
+        callable taking the writer connection (the result is its return
+        value). Everything queued while the previous commit was running is
+        applied in one transaction, each item inside its own savepoint so a
+        failing write only fails its own Future.
+        """
+        future = Future()
+        if self._owner == threading.get_ident():
+            # Already inside a transaction on this thread: run inline, since
+            # queueing would wait on the lock we hold.
+            try:
+                future.set_result(_apply(self._writer, work, params))
+            except Exception as error:
+                future.set_exception(error)
+            return future
+        # The writer thread records the write against the submitting rerun
+        self._writes.put((future, work, params, current_rerun()))
+        return future
+
+    def execute(self, sql, params=()):
+        return self.submit(sql, params).result()
+
+    def executemany(self, sql, rows):
+        return self.submit(_Many(sql, rows)).result()
+
+    def close(self):
+        self._writes.put(None)
+        self._writer_thread.join()
+
+    def _write_loop(self):
+        while True:
+            batch = [self._writes.get()]
+            while len(batch) < WRITE_BATCH:
+                try:
+                    batch.append(self._writes.get_nowait())
+                except queue.Empty:
+                    break
+            stop = None in batch
+            batch = [item for item in batch if item is not None]
+            if batch:
+                self._commit_group(batch)
+            if stop:
+                return
+
+    def _commit_group(self, batch):
+        done = []
+        try:
+            with self.transaction() as conn:
+                for future, work, params, rerun in batch:
+                    if not future.set_running_or_notify_cancel():
+                        continue
+                    conn.execute('SAVEPOINT queued_write')
+                    try:
+                        result = _apply(conn, work, params, rerun)
+                    except Exception as error:
+                        conn.execute('ROLLBACK TO queued_write')
+                        conn.execute('RELEASE queued_write')
+                        future.set_exception(error)
+                    else:
+                        conn.execute('RELEASE queued_write')
+                        done.append((future, result))
+        except Exception as error:
+            # BEGIN/COMMIT failed (e.g. still busy after retrying): fail every
+            # item that has no outcome yet, so no caller waits forever
+            for future, *_ in batch:
+                if not future.done():
+                    future.set_exception(error)
+        else:
+            for future, result in done:
+                future.set_result(result)
+
+
+class _Many:
+    """executemany() as queued work, keeping its SQL for the profiler."""
+
+    def __init__(self, sql, rows):
+        self.sql = sql
+        self.rows = rows
+
+    def __call__(self, conn):
+        return conn.executemany(self.sql, self.rows)
+
+
+def _apply(conn, work, params, rerun=None):
+    started = time.perf_counter()
+    result = work(conn) if callable(work) else conn.execute(work, params)
+    rows = result.rowcount if isinstance(result, sqlite3.Cursor) else None
+    if isinstance(work, str):
+        record(conn, work, params, time.perf_counter() - started, rows, rerun)
+    else:
+        # Only the batch as a whole is timed; its statements are not explained
+        label = getattr(work, 'sql', None) or f"<{getattr(work, '__qualname__', type(work).__name__)}>"
+        record(None, label, (), time.perf_counter() - started, rows, rerun)
+    return result
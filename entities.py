@@ -0,0 +1,25 @@
+from dataclasses import dataclass
+
+GENDERS = ('Male', 'Female', 'Other')
+MIN_AGE = 1
+
+
+@dataclass(frozen=True)
+class Entity:
+    table: str
+    label: str
+    columns: tuple
+    # Keyset pagination compares (sort column, id) row values, so every sort
+    # column must be NOT NULL and backed by an index (migration 4).
+    sort_columns: tuple = ('id',)
+    # Columns shown for a row in pickers and confirmations
+    title: tuple = ('name',)
+
+
+STUDENTS = Entity('students', 'Student', ('id', 'name', 'email', 'phone', 'age', 'gender'), ('id', 'name'), ('name', 'email'))
+TEACHERS = Entity('teachers', 'Teacher', ('id', 'name', 'subject', 'email', 'phone', 'qualification', 'address'), ('id', 'name'), ('name', 'subject'))
+COURSES = Entity('courses', 'Course', ('id', 'name', 'fee', 'duration'), ('id', 'name', 'fee'))
+DEPARTMENTS = Entity('departments', 'Department', ('id', 'name'), ('id', 'name'))
+EXAMS = Entity('exams', 'Exam', ('id', 'exam_name', 'exam_date', 'start_time', 'end_time', 'max_marks'), ('id', 'exam_name', 'exam_date'), ('exam_name', 'exam_date'))
+
+ENTITIES = {entity.table: entity for entity in (STUDENTS, TEACHERS, COURSES, DEPARTMENTS, EXAMS)}
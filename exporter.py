@@ -0,0 +1,161 @@
+import csv
+import io
+import tempfile
+from contextlib import closing
+from dataclasses import dataclass
+
+from archive import history
+from entities import ENTITIES
+
+CHUNK_ROWS = 10000
+SPOOL_MAX_BYTES = 8 * 1024 * 1024
+# Streamlit keeps a download's bytes in memory, so browser downloads are
+# capped; larger exports stream from the API (GET /exports/NAME, api.py)
+DOWNLOAD_MAX_ROWS = 200000
+FORMATS = {'CSV': ('csv', 'text/csv'), 'Parquet': ('parquet', 'application/vnd.apache.parquet')}
+
+
+@dataclass(frozen=True)
+class ExportSource:
+    name: str
+    label: str
+    sql: str
+    # (output column, source table, source column) - the source column's
+    # declared type decides the Parquet column type
+    columns: tuple
+    # Reads registrations_history (live + archived, archive.py) between the
+    # :start and :end dates instead of the live tables alone
+    history: bool = False
+
+
+def _table_source(entity):
+    return ExportSource(entity.table, f"{entity.label}s",
+                        f"SELECT {', '.join(entity.columns)} FROM {entity.table} ORDER BY id",
+                        tuple((column, entity.table, column) for column in entity.columns))
+
+
+REGISTRATIONS_REPORT = ExportSource('registrations_report', 'Registrations report', '''SELECT
+        r.id, r.registration_date,
+        r.student_id, s.name, s.email,
+        r.teacher_id, t.name, t.subject,
+        r.course_id, c.name, c.fee
+    FROM registrations_history r
+    LEFT JOIN students s ON s.id = r.student_id
+    LEFT JOIN teachers t ON t.id = r.teacher_id
+    LEFT JOIN courses c ON c.id = r.course_id
+    WHERE (:start IS NULL OR r.registration_date >= :start)
+      AND (:end IS NULL OR r.registration_date <= :end)
+    ORDER BY r.id''', (
+    ('registration_id', 'registrations', 'id'), ('registration_date', 'registrations', 'registration_date'),
+    ('student_id', 'registrations', 'student_id'), ('student_name', 'students', 'name'), ('student_email', 'students', 'email'),
+    ('teacher_id', 'registrations', 'teacher_id'), ('teacher_name', 'teachers', 'name'), ('teacher_subject', 'teachers', 'subject'),
+    ('course_id', 'registrations', 'course_id'), ('course_name', 'courses', 'name'), ('course_fee', 'courses', 'fee'),
+), history=True)
+
+EXPORT_SOURCES = {source.name: source for source in
+                  [_table_source(entity) for entity in ENTITIES.values()] + [REGISTRATIONS_REPORT]}
+
+
+# ======================= STREAMING =======================
+def export_rows(db, source, start=None, end=None):
+    """How many rows the export holds; raises ValueError if it cannot run."""
+    sql = f"SELECT COUNT(*) FROM ({source.sql})"
+    if source.history:
+        with history(db, start, end) as conn:
+            return db.scalar(sql, {'start': start, 'end': end}, conn)
+    return db.scalar(sql)
+
+
+def check_format(fmt):
+    """Raise ValueError if exports in `fmt` cannot be written here."""
+    if fmt not in FORMATS:
+        raise ValueError(f"unknown format {fmt!r}; use {' or '.join(FORMATS)}")
+    if fmt == 'Parquet':
+        _pyarrow()
+
+
+def iter_rows(db, source, chunk_rows=CHUNK_ROWS, start=None, end=None):
+    """Yield lists of row tuples from one read snapshot, never the whole result.
+
+    `start`/`end` (YYYY-MM-DD, inclusive) bound a history source's dates.
+    """
+    if not source.history:
+        # Its own connection, not a pooled reader: a slow client downloading
+        # from the API would otherwise hold a pool slot for the whole transfer
+        with closing(db.open_reader()) as conn:
+            yield from db.iter_chunks(source.sql, (), chunk_rows, conn)
+        return
+    with history(db, start, end) as conn:
+        yield from db.iter_chunks(source.sql, {'start': start, 'end': end}, chunk_rows, conn)
+
+
+def iter_csv(db, source, chunk_rows=CHUNK_ROWS, start=None, end=None):
+    """Yield the CSV export as UTF-8 byte chunks (header first)."""
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow([column for column, _, _ in source.columns])
+    for rows in iter_rows(db, source, chunk_rows, start, end):
+        writer.writerows(rows)
+        yield buffer.getvalue().encode()
+        buffer.seek(0)
+        buffer.truncate()
+    if buffer.tell():
+        yield buffer.getvalue().encode()
+
+
+def _pyarrow():
+    try:
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+    except ImportError as error:
+        raise ValueError("Parquet export needs pyarrow (pip install pyarrow).") from error
+    return pa, pq
+
+
+def _arrow_schema(db, source):
+    pa, _ = _pyarrow()
+    types = {'INTEGER': pa.int64(), 'REAL': pa.float64()}
+    declared = {}
+    for table in {table for _, table, _ in source.columns}:
+        for _, column, decl, *_ in db.fetchall(f"PRAGMA table_info({table})"):
+            declared[table, column] = decl.upper()
+    return pa.schema([(name, types.get(declared.get((table, column)), pa.string()))
+                      for name, table, column in source.columns])
+
+
+def write_parquet(db, source, file, chunk_rows=CHUNK_ROWS, start=None, end=None):
+    """Write the export to `file` as Parquet, one row group per chunk."""
+    pa, pq = _pyarrow()
+    schema = _arrow_schema(db, source)
+    with pq.ParquetWriter(file, schema) as writer:
+        for rows in iter_rows(db, source, chunk_rows, start, end):
+            columns = zip(*rows)
+            writer.write_table(pa.Table.from_arrays(
+                [pa.array(values, type=field.type) for values, field in zip(columns, schema)], schema=schema))
+
+
+def export_file(db, source, fmt, start=None, end=None):
+    """Spool a full export to a temporary file and return it rewound.
+
+    Small exports stay in memory; anything over SPOOL_MAX_BYTES rolls over
+    to disk.
+    """
+    spool = tempfile.SpooledTemporaryFile(max_size=SPOOL_MAX_BYTES)
+    if fmt == 'Parquet':
+        write_parquet(db, source, spool, start=start, end=end)
+    else:
+        for chunk in iter_csv(db, source, start=start, end=end):
+            spool.write(chunk)
+    spool.seek(0)
+    return spool
+
+
+def browser_download(db, source, fmt, start=None, end=None):
+    """The export as bytes, for st.download_button.
+
+    Streamlit only accepts bytes-like data (not a spooled file) and keeps it
+    in memory anyway, which is why browser downloads are capped at
+    DOWNLOAD_MAX_ROWS.
+    """
+    with export_file(db, source, fmt, start, end) as spool:
+        return spool.read()
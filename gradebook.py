@@ -0,0 +1,93 @@
+import json
+
+import numpy as np
+import pandas as pd
+
+# Percentage thresholds for D, C, B, A; anything below the first is an F.
+GRADE_THRESHOLDS = np.array([60, 70, 80, 90])
+GRADE_LETTERS = np.array(['F', 'D', 'C', 'B', 'A'])
+GRADE_POINTS = np.array([0.0, 1.0, 2.0, 3.0, 4.0])
+PERCENTILES = [10, 25, 50, 75, 90]
+PASS_PERCENT = 60
+
+
+# ======================= DATA ACCESS =======================
+def exam_grades(db, exam_id):
+    """Every mark recorded for one exam, with the student's name."""
+    return db.query('''SELECT g.student_id, s.name AS student, g.marks
+        FROM grades g JOIN students s ON s.id = g.student_id
+        WHERE g.exam_id = ?
+        ORDER BY g.student_id''', (exam_id,))
+
+
+def unknown_students(db, student_ids):
+    """Ids in `student_ids` that have no students row."""
+    return [value for (value,) in db.fetchall(
+        "SELECT value FROM json_each(?) WHERE value NOT IN (SELECT id FROM students)",
+        (json.dumps([int(student_id) for student_id in student_ids]),))]
+
+
+def save_exam_grades(db, exam_id, grades, removed=()):
+    """Upsert (student_id, marks) rows and drop `removed` students, in one transaction."""
+    rows = [(int(student_id), int(exam_id), None if pd.isna(marks) else float(marks))
+            for student_id, marks in grades]
+
+    def save(conn):
+        conn.executemany('''INSERT INTO grades (student_id, exam_id, marks) VALUES (?, ?, ?)
+            ON CONFLICT (student_id, exam_id) DO UPDATE SET marks = excluded.marks''', rows)
+        conn.execute("DELETE FROM grades WHERE exam_id = ? AND student_id IN (SELECT value FROM json_each(?))",
+                     (int(exam_id), json.dumps([int(student_id) for student_id in removed])))
+    db.submit(save).result()
+
+
+# ======================= VECTORISED STATISTICS =======================
+def grade_points(percent):
+    """Map an array of percentages to (letters, GPA points) in one pass."""
+    index = np.searchsorted(GRADE_THRESHOLDS, np.asarray(percent, dtype=float), side='right')
+    return GRADE_LETTERS[index], GRADE_POINTS[index]
+
+
+def exam_results(grades, max_marks):
+    """Per-student results and cohort summary for one exam.
+
+    Every column is computed over whole NumPy arrays - no Python loop over
+    students - so a 50k-student exam takes milliseconds.
+    """
+    results = grades.dropna(subset=['marks']).copy()
+    marks = results['marks'].to_numpy(dtype=float)
+    results['percent'] = marks / float(max_marks) * 100
+    results['letter'], results['points'] = grade_points(results['percent'])
+    results['rank'] = results['marks'].rank(method='min', ascending=False).astype('int64')
+    results['percentile'] = results['marks'].rank(pct=True) * 100
+    results = results.sort_values(['rank', 'student_id'])
+
+    summary = {'count': len(marks)}
+    if len(marks):
+        summary.update(
+            mean=marks.mean(), std=marks.std(), min=marks.min(), max=marks.max(),
+            pass_rate=(results['percent'].to_numpy() >= PASS_PERCENT).mean() * 100,
+            **{f'p{q}': value for q, value in zip(PERCENTILES, np.percentile(marks, PERCENTILES))},
+        )
+    return results, summary
+
+
+def cohort_gpa(db):
+    """GPA and class rank for every graded student across all exams.
+
+    One columnar read of (student, marks, max marks), then percentage, grade
+    points and the per-student mean are all vectorised.
+    """
+    grades = db.query('''SELECT g.student_id, g.marks, e.max_marks
+        FROM grades g JOIN exams e ON e.id = g.exam_id
+        WHERE g.marks IS NOT NULL''')
+    if grades.empty:
+        return pd.DataFrame(columns=['student_id', 'student', 'exams', 'average_percent', 'gpa', 'rank'])
+    percent = grades['marks'].to_numpy(dtype=float) / grades['max_marks'].to_numpy(dtype=float) * 100
+    grades['percent'] = percent
+    grades['points'] = grade_points(percent)[1]
+    gpa = grades.groupby('student_id').agg(exams=('points', 'size'), average_percent=('percent', 'mean'),
+                                           gpa=('points', 'mean')).reset_index()
+    gpa['rank'] = gpa['gpa'].rank(method='min', ascending=False).astype('int64')
+    names = db.query("SELECT id AS student_id, name AS student FROM students WHERE id IN (SELECT DISTINCT student_id FROM grades)")
+    return gpa.merge(names, on='student_id', how='left').sort_values(['rank', 'student_id'])[
+        ['student_id', 'student', 'exams', 'average_percent', 'gpa', 'rank']]
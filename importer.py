@@ -0,0 +1,224 @@
+import math
+import sqlite3
+import time
+from dataclasses import dataclass, field
+from datetime import datetime
+
+import pandas as pd
+
+from entities import GENDERS, MIN_AGE
+
+CHUNK_ROWS = 5000
+MAX_REPORTED_ERRORS = 1000
+SQL_PARAM_BATCH = 500
+
+
+@dataclass(frozen=True)
+class ImportSpec:
+    table: str
+    required: tuple
+    optional: tuple = ()
+    numeric: tuple = ()
+    integer: tuple = ()
+    # Stored as YYYY-MM-DD whatever date/datetime text the file holds
+    dates: tuple = ()
+    unique: tuple = ()
+    # column -> allowed values / lowest allowed number
+    choices: dict = field(default_factory=dict)
+    minimum: dict = field(default_factory=dict)
+    # column -> table whose ids it must reference
+    references: dict = field(default_factory=dict)
+
+
+IMPORT_SPECS = {
+    'students': ImportSpec('students', ('name', 'email', 'gender'), ('age', 'phone'),
+                           numeric=('age',), integer=('age',), unique=('email',), choices={'gender': GENDERS},
+                           minimum={'age': MIN_AGE}),
+    'teachers': ImportSpec('teachers', ('name', 'email'), ('subject', 'phone', 'qualification', 'address'),
+                           unique=('email',)),
+    'courses': ImportSpec('courses', ('name', 'fee'), ('duration',), numeric=('fee',), minimum={'fee': 0}),
+    'registrations': ImportSpec('registrations', ('student_id', 'teacher_id', 'course_id'), ('registration_date',),
+                                numeric=('student_id', 'teacher_id', 'course_id'), dates=('registration_date',),
+                                references={'student_id': 'students', 'teacher_id': 'teachers', 'course_id': 'courses'}),
+}
+
+
+@dataclass
+class ImportReport:
+    processed: int = 0
+    inserted: int = 0
+    failed: int = 0
+    seconds: float = 0.0
+    errors: list = field(default_factory=list)   # (row number, message), capped
+
+    @property
+    def rows_per_second(self):
+        return self.processed / self.seconds if self.seconds else 0.0
+
+    def error(self, row, message):
+        self.failed += 1
+        if len(self.errors) < MAX_REPORTED_ERRORS:
+            self.errors.append((row, message))
+
+
+# ======================= READING =======================
+def read_chunks(file, filename, chunksize=CHUNK_ROWS):
+    """Yield DataFrames of at most `chunksize` rows, all values as stripped text."""
+    if filename.lower().endswith(('.xlsx', '.xlsm')):
+        chunks = _excel_chunks(file, chunksize)
+    else:
+        chunks = pd.read_csv(file, chunksize=chunksize, dtype=str, keep_default_na=False, skipinitialspace=True)
+    for chunk in chunks:
+        chunk.columns = [str(column).strip().lower() for column in chunk.columns]
+        yield chunk.apply(lambda column: column.fillna('').astype(str).str.strip())
+
+
+def _excel_chunks(file, chunksize):
+    try:
+        from openpyxl import load_workbook
+    except ImportError as error:
+        raise ValueError("Excel import needs openpyxl (pip install openpyxl); upload a CSV instead.") from error
+    rows = load_workbook(file, read_only=True, data_only=True).active.iter_rows(values_only=True)
+    header = [str(value or '') for value in next(rows, ())]
+    batch = []
+    for row in rows:
+        batch.append(['' if value is None else value for value in row])
+        if len(batch) == chunksize:
+            yield pd.DataFrame(batch, columns=header)
+            batch = []
+    if batch:
+        yield pd.DataFrame(batch, columns=header)
+
+
+# ======================= VALIDATION =======================
+def _existing(db, table, column, values):
+    """Subset of `values` already present in table.column (index lookups)."""
+    found = set()
+    values = list(values)
+    for start in range(0, len(values), SQL_PARAM_BATCH):
+        batch = values[start:start + SQL_PARAM_BATCH]
+        placeholders = ', '.join('?' * len(batch))
+        found.update(value for (value,) in db.fetchall(
+            f"SELECT {column} FROM {table} WHERE {column} IN ({placeholders})", batch))
+    return found
+
+
+def validate_chunk(db, spec, chunk, seen):
+    """Split a chunk into (valid rows, per-row error messages) with column-wise checks.
+
+    `seen` holds unique values from earlier chunks of the same file.
+    """
+    errors = pd.Series('', index=chunk.index, dtype=object)
+
+    def flag(mask, message):
+        errors[mask & (errors == '')] = message
+
+    for column in spec.required:
+        flag(chunk[column] == '', f"missing {column}")
+    for column in spec.numeric:
+        if column in chunk:
+            converted = pd.to_numeric(chunk[column], errors='coerce')
+            flag(converted.isna() & (chunk[column] != ''), f"{column} is not a number")
+            chunk[column] = converted
+    for column in spec.integer:
+        if column in chunk:
+            flag(chunk[column].notna() & (chunk[column] % 1 != 0), f"{column} must be a whole number")
+    for column, lowest in spec.minimum.items():
+        if column in chunk:
+            flag(chunk[column] < lowest, f"{column} must be at least {lowest}")
+    for column in spec.dates:
+        if column in chunk:
+            # Excel date cells arrive as 'YYYY-MM-DD 00:00:00'
+            parsed = pd.to_datetime(chunk[column], errors='coerce', format='ISO8601')
+            flag(parsed.isna() & (chunk[column] != ''), f"{column} is not a YYYY-MM-DD date")
+            chunk[column] = parsed.dt.strftime('%Y-%m-%d').fillna('')
+    for column, allowed in spec.choices.items():
+        if column in chunk:
+            flag((chunk[column] != '') & ~chunk[column].isin(allowed), f"{column} must be one of {', '.join(allowed)}")
+    for column in spec.unique:
+        values = chunk[column]
+        flag(values.duplicated(keep='first'), f"duplicate {column} in file")
+        flag(values.map(seen.setdefault(column, set()).__contains__).astype(bool), f"duplicate {column} in file")
+        flag(values.isin(_existing(db, spec.table, column, values[values != ''].unique())), f"{column} already exists")
+    for column, table in spec.references.items():
+        ids = chunk[column].dropna().astype('int64')
+        known = _existing(db, table, 'id', [int(value) for value in ids.unique()])
+        flag(chunk[column].notna() & ~chunk[column].isin(known), f"unknown {column}")
+
+    valid = chunk[errors == '']
+    for column in spec.unique:
+        seen[column].update(valid[column])
+    return valid, errors[errors != '']
+
+
+# ======================= LOADING =======================
+def _value(value):
+    if value is None or value == '' or (isinstance(value, float) and math.isnan(value)):
+        return None
+    return value.item() if hasattr(value, 'item') else value
+
+
+def _rows(spec, valid):
+    """(columns, [(row number, *values)]) ready for executemany."""
+    columns = [column for column in spec.required + spec.optional if column in valid]
+    frame = valid[columns].copy()
+    for column in spec.references:
+        frame[column] = frame[column].astype('int64')
+    if spec.table == 'registrations':
+        today = datetime.now().strftime("%Y-%m-%d")
+        if 'registration_date' in frame:
+            frame['registration_date'] = frame['registration_date'].replace('', today)
+        else:
+            frame['registration_date'] = today
+            columns.append('registration_date')
+    return columns, [(row, *map(_value, values)) for row, *values in frame.itertuples(name=None)]
+
+
+def import_file(db, table, file, filename, chunksize=CHUNK_ROWS):
+    """Validate and load `file` chunk by chunk, yielding the running report.
+
+    Each chunk is inserted with executemany in its own transaction, so at
+    most one chunk is ever held in memory.
+    """
+    spec = IMPORT_SPECS[table]
+    report = ImportReport()
+    seen = {}
+    started = time.perf_counter()
+    for chunk in read_chunks(file, filename, chunksize):
+        missing = [column for column in spec.required if column not in chunk]
+        if missing:
+            raise ValueError(f"Missing column(s): {', '.join(missing)}")
+        # +2: 1-based rows plus the header line
+        chunk.index = pd.RangeIndex(report.processed + 2, report.processed + 2 + len(chunk))
+
+        valid, errors = validate_chunk(db, spec, chunk, seen)
+        for row, message in errors.items():
+            report.error(row, message)
+        if not valid.empty:
+            columns, rows = _rows(spec, valid)
+            sql = f"INSERT INTO {table} ({', '.join(columns)}) VALUES ({', '.join('?' * len(columns))})"
+            report.inserted += _insert(db, report, sql, rows)
+        report.processed += len(chunk)
+        report.seconds = time.perf_counter() - started
+        yield report
+
+
+def _insert(db, report, sql, rows):
+    try:
+        db.executemany(sql, [row[1:] for row in rows])
+        return len(rows)
+    except sqlite3.IntegrityError:
+        pass
+
+    # A concurrent writer beat us to a unique value: retry row by row so the
+    # offending rows are reported and the rest of the chunk still loads.
+    def insert_rows(conn):
+        inserted = 0
+        for row_number, *values in rows:
+            try:
+                conn.execute(sql, values)
+                inserted += 1
+            except sqlite3.IntegrityError as error:
+                report.error(row_number, str(error))
+        return inserted
+    return db.submit(insert_rows).result()
@@ -0,0 +1,262 @@
+import sqlite3
+
+# Tables whose row counts are kept in the stats table (migration 3)
+STAT_TABLES = ('students', 'teachers', 'courses', 'departments', 'exams', 'registrations')
+
+# Tables whose writes bump a generation in table_versions (migration 10)
+VERSIONED_TABLES = STAT_TABLES + ('grades',)
+
+# Columns indexed for full-text search, per table (migration 5)
+SEARCH_COLUMNS = {
+    'students': ('name', 'email', 'phone'),
+    'teachers': ('name', 'email', 'subject', 'qualification'),
+    'courses': ('name',),
+    'departments': ('name',),
+    'exams': ('exam_name',),
+}
+
+# Registration summary tables and the columns they group by (migration 7)
+SUMMARY_TABLES = {
+    'registrations_by_course': ('course_id',),
+    'registrations_by_teacher': ('teacher_id',),
+    'registrations_by_day': ('registration_date', 'course_id'),
+}
+
+
+def _fts_statements(table, columns):
+    # External-content FTS5 table mirrored from `table` by triggers
+    names = ', '.join(columns)
+    new = ', '.join(f'new.{column}' for column in columns)
+    old = ', '.join(f'old.{column}' for column in columns)
+    return [
+        f"CREATE VIRTUAL TABLE IF NOT EXISTS {table}_fts USING fts5({names}, content='{table}', content_rowid='id', prefix='2 3')",
+        f'''CREATE TRIGGER IF NOT EXISTS {table}_fts_insert AFTER INSERT ON {table} BEGIN
+            INSERT INTO {table}_fts (rowid, {names}) VALUES (new.id, {new});
+        END''',
+        f'''CREATE TRIGGER IF NOT EXISTS {table}_fts_delete AFTER DELETE ON {table} BEGIN
+            INSERT INTO {table}_fts ({table}_fts, rowid, {names}) VALUES ('delete', old.id, {old});
+        END''',
+        f'''CREATE TRIGGER IF NOT EXISTS {table}_fts_update AFTER UPDATE ON {table} BEGIN
+            INSERT INTO {table}_fts ({table}_fts, rowid, {names}) VALUES ('delete', old.id, {old});
+            INSERT INTO {table}_fts (rowid, {names}) VALUES (new.id, {new});
+        END''',
+        f"INSERT INTO {table}_fts ({table}_fts) VALUES ('rebuild')",
+    ]
+
+
+def summary_backfill(table, keys):
+    names = ', '.join(keys)
+    present = ' AND '.join(f'{key} IS NOT NULL' for key in keys)
+    return f"INSERT INTO {table} ({names}, registrations) SELECT {names}, COUNT(*) FROM registrations WHERE {present} GROUP BY {names}"
+
+
+def _summary_delete_trigger(table, keys, condition=None):
+    old_match = ' AND '.join(f'{key} = old.{key}' for key in keys)
+    when = ' AND '.join(f'old.{key} IS NOT NULL' for key in keys) + (f' AND {condition}' if condition else '')
+    decrement = f"UPDATE {table} SET registrations = registrations - 1 WHERE {old_match};"
+    return f"CREATE TRIGGER IF NOT EXISTS {table}_delete AFTER DELETE ON registrations WHEN {when} BEGIN {decrement} END"
+
+
+def _summary_statements(table, keys):
+    # Registration counts grouped by `keys`, maintained by triggers
+    names = ', '.join(keys)
+    new = ', '.join(f'new.{key}' for key in keys)
+    old_match = ' AND '.join(f'{key} = old.{key}' for key in keys)
+    new_present = ' AND '.join(f'new.{key} IS NOT NULL' for key in keys)
+    old_present = ' AND '.join(f'old.{key} IS NOT NULL' for key in keys)
+    increment = f'''INSERT INTO {table} ({names}, registrations) VALUES ({new}, 1)
+                ON CONFLICT ({names}) DO UPDATE SET registrations = registrations + 1;'''
+    decrement = f"UPDATE {table} SET registrations = registrations - 1 WHERE {old_match};"
+    return [
+        f"CREATE TABLE IF NOT EXISTS {table} ({names}, registrations INTEGER NOT NULL DEFAULT 0, PRIMARY KEY ({names})) WITHOUT ROWID",
+        summary_backfill(table, keys),
+        f"CREATE TRIGGER IF NOT EXISTS {table}_insert AFTER INSERT ON registrations WHEN {new_present} BEGIN {increment} END",
+        _summary_delete_trigger(table, keys),
+        f"CREATE TRIGGER IF NOT EXISTS {table}_update_old AFTER UPDATE OF {names} ON registrations WHEN {old_present} BEGIN {decrement} END",
+        f"CREATE TRIGGER IF NOT EXISTS {table}_update_new AFTER UPDATE OF {names} ON registrations WHEN {new_present} BEGIN {increment} END",
+    ]
+
+
+# ======================= SCHEMA MIGRATIONS =======================
+# Each entry upgrades the database by one version; its position (starting at 1)
+# is the version number stored in PRAGMA user_version. Never edit a migration
+# that has shipped - append a new one instead.
+MIGRATIONS = [
+    # 1: original schema (IF NOT EXISTS so pre-versioning databases adopt it)
+    [
+        '''CREATE TABLE IF NOT EXISTS departments (id INTEGER PRIMARY KEY AUTOINCREMENT, name TEXT NOT NULL UNIQUE)''',
+        '''CREATE TABLE IF NOT EXISTS courses (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            name TEXT NOT NULL,
+            fee REAL NOT NULL,
+            duration TEXT
+        )''',
+        '''CREATE TABLE IF NOT EXISTS teachers (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            name TEXT NOT NULL,
+            subject TEXT,
+            email TEXT UNIQUE,
+            phone TEXT,
+            qualification TEXT,
+            address TEXT
+        )''',
+        '''CREATE TABLE IF NOT EXISTS students (id INTEGER PRIMARY KEY AUTOINCREMENT, name TEXT NOT NULL, age INTEGER, gender TEXT, phone TEXT, email TEXT UNIQUE)''',
+        '''CREATE TABLE IF NOT EXISTS exams (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            exam_name TEXT NOT NULL,
+            exam_date TEXT NOT NULL,
+            exam_time TEXT NOT NULL
+        )''',
+        '''CREATE TABLE IF NOT EXISTS registrations (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            student_id INTEGER,
+            teacher_id INTEGER,
+            course_id INTEGER,
+            registration_date TEXT,
+            FOREIGN KEY(student_id) REFERENCES students(id),
+            FOREIGN KEY(teacher_id) REFERENCES teachers(id),
+            FOREIGN KEY(course_id) REFERENCES courses(id)
+        )''',
+    ],
+    # 2: grades (referenced by the student delete path but never created)
+    [
+        '''CREATE TABLE IF NOT EXISTS grades (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            student_id INTEGER NOT NULL,
+            exam_id INTEGER NOT NULL,
+            marks REAL,
+            FOREIGN KEY(student_id) REFERENCES students(id),
+            FOREIGN KEY(exam_id) REFERENCES exams(id),
+            UNIQUE(student_id, exam_id)
+        )''',
+    ],
+    # 3: dashboard counters kept current by triggers instead of COUNT(*) scans
+    [
+        '''CREATE TABLE IF NOT EXISTS stats (name TEXT PRIMARY KEY, value INTEGER NOT NULL DEFAULT 0) WITHOUT ROWID''',
+        *[statement for table in STAT_TABLES for statement in (
+            f"INSERT OR REPLACE INTO stats (name, value) SELECT '{table}', COUNT(*) FROM {table}",
+            f'''CREATE TRIGGER IF NOT EXISTS stats_{table}_insert AFTER INSERT ON {table}
+                BEGIN UPDATE stats SET value = value + 1 WHERE name = '{table}'; END''',
+            f'''CREATE TRIGGER IF NOT EXISTS stats_{table}_delete AFTER DELETE ON {table}
+                BEGIN UPDATE stats SET value = value - 1 WHERE name = '{table}'; END''',
+        )],
+    ],
+    # 4: indexes behind the sortable columns of the paginated View tabs
+    [
+        'CREATE INDEX IF NOT EXISTS idx_students_name ON students(name)',
+        'CREATE INDEX IF NOT EXISTS idx_teachers_name ON teachers(name)',
+        'CREATE INDEX IF NOT EXISTS idx_courses_name ON courses(name)',
+        'CREATE INDEX IF NOT EXISTS idx_courses_fee ON courses(fee)',
+        'CREATE INDEX IF NOT EXISTS idx_exams_name ON exams(exam_name)',
+        'CREATE INDEX IF NOT EXISTS idx_exams_date ON exams(exam_date)',
+    ],
+    # 5: FTS5 search indexes over the Search tab columns, backfilled once
+    [statement for table, columns in SEARCH_COLUMNS.items() for statement in _fts_statements(table, columns)],
+    # 6: foreign-key indexes, orphan cleanup and cascading deletes. The FKs
+    # were declared without ON DELETE CASCADE and SQLite cannot alter them,
+    # so BEFORE DELETE triggers remove the children first (this also keeps
+    # PRAGMA foreign_keys=ON from rejecting the parent delete).
+    [
+        'CREATE INDEX IF NOT EXISTS idx_registrations_student ON registrations(student_id)',
+        'CREATE INDEX IF NOT EXISTS idx_registrations_teacher ON registrations(teacher_id)',
+        'CREATE INDEX IF NOT EXISTS idx_registrations_course ON registrations(course_id)',
+        'CREATE INDEX IF NOT EXISTS idx_grades_exam ON grades(exam_id)',
+        'DELETE FROM registrations WHERE student_id NOT IN (SELECT id FROM students)',
+        'DELETE FROM registrations WHERE teacher_id NOT IN (SELECT id FROM teachers)',
+        'DELETE FROM registrations WHERE course_id NOT IN (SELECT id FROM courses)',
+        'DELETE FROM grades WHERE student_id NOT IN (SELECT id FROM students)',
+        'DELETE FROM grades WHERE exam_id NOT IN (SELECT id FROM exams)',
+        '''CREATE TRIGGER IF NOT EXISTS students_cascade_delete BEFORE DELETE ON students BEGIN
+            DELETE FROM registrations WHERE student_id = old.id;
+            DELETE FROM grades WHERE student_id = old.id;
+        END''',
+        '''CREATE TRIGGER IF NOT EXISTS teachers_cascade_delete BEFORE DELETE ON teachers BEGIN
+            DELETE FROM registrations WHERE teacher_id = old.id;
+        END''',
+        '''CREATE TRIGGER IF NOT EXISTS courses_cascade_delete BEFORE DELETE ON courses BEGIN
+            DELETE FROM registrations WHERE course_id = old.id;
+        END''',
+        '''CREATE TRIGGER IF NOT EXISTS exams_cascade_delete BEFORE DELETE ON exams BEGIN
+            DELETE FROM grades WHERE exam_id = old.id;
+        END''',
+    ],
+    # 7: registration summaries for the analytics page (revenue is derived
+    # from the current course fee at read time, so fee edits need no rebuild)
+    [statement for table, keys in SUMMARY_TABLES.items() for statement in _summary_statements(table, keys)],
+    # 8: gradebook - a marking scale per exam and a covering index so a whole
+    # exam's marks are read straight from the index
+    [
+        'ALTER TABLE exams ADD COLUMN max_marks REAL NOT NULL DEFAULT 100',
+        'DROP INDEX IF EXISTS idx_grades_exam',
+        'CREATE INDEX IF NOT EXISTS idx_grades_exam_student_marks ON grades(exam_id, student_id, marks)',
+    ],
+    # 9: structured exam times for clash detection. exam_time was free text;
+    # values SQLite reads as a time become a start with a 3-hour slot (capped
+    # at midnight), anything else stays unscheduled until edited.
+    [
+        'ALTER TABLE exams ADD COLUMN start_time TEXT',
+        'ALTER TABLE exams ADD COLUMN end_time TEXT',
+        '''UPDATE exams SET start_time = strftime('%H:%M', trim(exam_time)),
+            end_time = strftime('%H:%M', trim(exam_time), '+3 hours')
+            WHERE time(trim(exam_time)) IS NOT NULL''',
+        '''UPDATE exams SET end_time = '23:59' WHERE end_time < start_time''',
+        'CREATE INDEX IF NOT EXISTS idx_exams_date_start ON exams(exam_date, start_time)',
+    ],
+    # 10: per-table write generations; cached query results (cache.py) stay
+    # valid until a table they read from moves on
+    [
+        '''CREATE TABLE IF NOT EXISTS table_versions (name TEXT PRIMARY KEY, version INTEGER NOT NULL DEFAULT 0) WITHOUT ROWID''',
+        *[statement for table in VERSIONED_TABLES for statement in (
+            f"INSERT OR IGNORE INTO table_versions (name) VALUES ('{table}')",
+            *(f'''CREATE TRIGGER IF NOT EXISTS versions_{table}_{event.lower()} AFTER {event} ON {table}
+                BEGIN UPDATE table_versions SET version = version + 1 WHERE name = '{table}'; END'''
+              for event in ('INSERT', 'UPDATE', 'DELETE')),
+        )],
+    ],
+    # 11: archiving old registrations to per-year files (archive.py). Rows
+    # moved out while archive_state.moving is set do not count as deletions,
+    # so the counters and summaries keep the archived history.
+    [
+        'CREATE INDEX IF NOT EXISTS idx_registrations_date ON registrations(registration_date)',
+        '''CREATE TABLE IF NOT EXISTS registration_archives (year INTEGER PRIMARY KEY, registrations INTEGER NOT NULL DEFAULT 0)''',
+        '''CREATE TABLE IF NOT EXISTS archive_state (id INTEGER PRIMARY KEY CHECK (id = 1), moving INTEGER NOT NULL DEFAULT 0)''',
+        'INSERT OR IGNORE INTO archive_state (id, moving) VALUES (1, 0)',
+        'DROP TRIGGER IF EXISTS stats_registrations_delete',
+        '''CREATE TRIGGER IF NOT EXISTS stats_registrations_delete AFTER DELETE ON registrations
+            WHEN NOT (SELECT moving FROM archive_state)
+            BEGIN UPDATE stats SET value = value - 1 WHERE name = 'registrations'; END''',
+        *[statement for table, keys in SUMMARY_TABLES.items() for statement in (
+            f'DROP TRIGGER IF EXISTS {table}_delete',
+            _summary_delete_trigger(table, keys, 'NOT (SELECT moving FROM archive_state)'),
+        )],
+    ],
+]
+
+SCHEMA_VERSION = len(MIGRATIONS)
+
+
+def migrate(conn):
+    """Bring the database up to SCHEMA_VERSION, one transaction per migration."""
+    if conn.execute('PRAGMA user_version').fetchone()[0] >= SCHEMA_VERSION:
+        return
+    previous = conn.isolation_level
+    conn.isolation_level = None
+    try:
+        while True:
+            # IMMEDIATE takes the write lock up front, so two processes starting
+            # together cannot both apply the same migration.
+            conn.execute('BEGIN IMMEDIATE')
+            version = conn.execute('PRAGMA user_version').fetchone()[0]
+            if version >= SCHEMA_VERSION:
+                conn.execute('COMMIT')
+                break
+            try:
+                for statement in MIGRATIONS[version]:
+                    conn.execute(statement)
+                conn.execute(f'PRAGMA user_version = {version + 1}')
+                conn.execute('COMMIT')
+            except sqlite3.Error:
+                conn.execute('ROLLBACK')
+                raise
+    finally:
+        conn.isolation_level = previous
@@ -0,0 +1,103 @@
+import logging
+import os
+import sqlite3
+import threading
+from contextvars import ContextVar
+from dataclasses import dataclass, field
+from logging.handlers import RotatingFileHandler
+from pathlib import Path
+
+# Statements slower than this get an EXPLAIN QUERY PLAN and a slow-log entry
+SLOW_QUERY_MS = float(os.environ.get('CLASSROOM_SLOW_QUERY_MS', '100'))
+SLOW_LOG_PATH = os.environ.get('CLASSROOM_SLOW_LOG', str(Path(__file__).with_name('slow_queries.log')))
+SLOW_LOG_BYTES = 5 * 1024 * 1024
+SLOW_LOG_BACKUPS = 3
+
+
+@dataclass
+class Statement:
+    sql: str
+    ms: float
+    rows: int = None
+    location: str = ''
+    plan: list = None   # EXPLAIN QUERY PLAN details, only for slow statements
+
+    @property
+    def full_scan(self):
+        # 'SCAN t' reads every row; 'SCAN t USING ... INDEX' is an index walk
+        return any(step.startswith('SCAN') and 'INDEX' not in step for step in self.plan or ())
+
+
+@dataclass
+class Rerun:
+    """Every statement recorded while one script run was current."""
+    location: str
+    statements: list = field(default_factory=list)
+
+    @property
+    def total_ms(self):
+        return sum(statement.ms for statement in self.statements)
+
+
+_current = ContextVar('profiler_rerun', default=None)
+_log_lock = threading.Lock()
+_slow_log = None
+
+
+def start_rerun(location):
+    """Collect the statements of this script run (per session thread) under `location`."""
+    rerun = Rerun(location)
+    _current.set(rerun)
+    return rerun
+
+
+def set_section(section):
+    rerun = _current.get()
+    if rerun is not None:
+        rerun.location = f"{rerun.location.split(' / ')[0]} / {section}"
+
+
+def current_rerun():
+    return _current.get()
+
+
+def slow_log():
+    """The rolling slow-query log, opened on first use."""
+    global _slow_log
+    with _log_lock:
+        if _slow_log is None:
+            logger = logging.getLogger('classroom.slow_queries')
+            handler = RotatingFileHandler(SLOW_LOG_PATH, maxBytes=SLOW_LOG_BYTES, backupCount=SLOW_LOG_BACKUPS,
+                                          encoding='utf-8', delay=True)
+            handler.setFormatter(logging.Formatter('%(asctime)s %(message)s'))
+            logger.addHandler(handler)
+            logger.setLevel(logging.INFO)
+            logger.propagate = False
+            _slow_log = logger
+    return _slow_log
+
+
+def explain(conn, sql, params=()):
+    try:
+        return [row[3] for row in conn.execute(f'EXPLAIN QUERY PLAN {sql}', params)]
+    except (sqlite3.Error, ValueError):
+        # Not explainable (PRAGMA, BEGIN, several statements...) or unbindable
+        return None
+
+
+def record(conn, sql, params, seconds, rows=None, rerun=None):
+    """Attribute one statement to `rerun` (default: the current one); log it if slow.
+
+    `conn` is the connection that ran it, used for EXPLAIN QUERY PLAN, or
+    None when `sql` only describes a batch of work.
+    """
+    rerun = rerun or _current.get()
+    statement = Statement(' '.join(sql.split()), seconds * 1000, rows, rerun.location if rerun else '')
+    if statement.ms >= SLOW_QUERY_MS:
+        if conn is not None:
+            statement.plan = explain(conn, sql, params)
+        slow_log().info('%.1fms rows=%s at=%s sql=%s plan=%s', statement.ms, rows, statement.location or '-',
+                        statement.sql, ' | '.join(statement.plan or ()) or '-')
+    if rerun is not None:
+        rerun.statements.append(statement)
+    return statement
@@ -0,0 +1,45 @@
+import json
+
+
+def fetch_page(db, entity, sort='id', descending=False, after=None, limit=50):
+    """One page of rows ordered by (sort, id), starting after the keyset cursor.
+
+    `after` is the (sort value, id) pair of the last row on the previous page,
+    so every page is an index range scan no matter how deep the user pages.
+    """
+    if sort not in entity.sort_columns:
+        raise ValueError(f"{entity.table} cannot be sorted by {sort!r}")
+    direction, op = ('DESC', '<') if descending else ('ASC', '>')
+    order = f"{sort} {direction}" if sort == 'id' else f"{sort} {direction}, id {direction}"
+    sql = f"SELECT {', '.join(entity.columns)} FROM {entity.table}"
+    params = ()
+    if after is not None:
+        if sort == 'id':
+            sql += f" WHERE id {op} ?"
+            params = (after[1],)
+        else:
+            sql += f" WHERE ({sort}, id) {op} (?, ?)"
+            params = tuple(after)
+    return db.query(f"{sql} ORDER BY {order} LIMIT ?", params + (limit,))
+
+
+def delete_records(db, entity, ids):
+    """Delete many rows in one transaction with a single set-based statement.
+
+    Dependent registrations and grades go with them (cascade triggers,
+    migration 6). Returns the number of rows deleted.
+    """
+    ids = json.dumps([int(record_id) for record_id in ids])
+    return db.execute(f"DELETE FROM {entity.table} WHERE id IN (SELECT value FROM json_each(?))", (ids,)).rowcount
+
+
+def get_record(db, entity, record_id):
+    """A single row as a dict, or None if it no longer exists."""
+    row = db.fetchone(f"SELECT {', '.join(entity.columns)} FROM {entity.table} WHERE id = ?", (record_id,))
+    return dict(zip(entity.columns, row)) if row else None
+
+
+def describe(entity, record):
+    """Human-readable label for a row, e.g. 'Jane Doe · jane@uni.edu (#42)'."""
+    parts = [str(record[column]) for column in entity.title if record[column] not in (None, '')]
+    return f"{' · '.join(parts)} (#{record['id']})"
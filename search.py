@@ -0,0 +1,33 @@
+import re
+
+import pandas as pd
+
+from cache import bump_versions
+from migrations import SEARCH_COLUMNS
+
+
+def fts_query(term):
+    """Turn free text into an FTS5 query: every word must match as a prefix."""
+    words = re.findall(r'\w+', term)
+    return ' '.join(f'"{word}"*' for word in words)
+
+
+def search(db, entity, term, limit=50, offset=0):
+    """Best-ranked (bm25) matches for `term`, one page at a time."""
+    match = fts_query(term)
+    if not match:
+        return pd.DataFrame(columns=list(entity.columns))
+    columns = ', '.join(f't.{column}' for column in entity.columns)
+    return db.query(f'''SELECT {columns}
+        FROM {entity.table}_fts f JOIN {entity.table} t ON t.id = f.rowid
+        WHERE {entity.table}_fts MATCH ?
+        ORDER BY f.rank LIMIT ? OFFSET ?''', (match, limit, offset))
+
+
+def rebuild_search_index(db, tables=tuple(SEARCH_COLUMNS)):
+    """Re-index from the base tables (e.g. after restoring an old backup)."""
+    def rebuild(conn):
+        for table in tables:
+            conn.execute(f"INSERT INTO {table}_fts ({table}_fts) VALUES ('rebuild')")
+        bump_versions(conn, tables)
+    db.submit(rebuild).result()
@@ -0,0 +1,171 @@
+"""Fill a classroom database with synthetic data for load testing.
+
+    python seed.py --students 1000000 --teachers 10000 --registrations 5000000
+
+Rows are generated lazily and inserted in large executemany batches, one
+transaction per batch, so memory stays flat at any volume. Every trigger
+(counters, search index, summaries, cache versions) fires as for app writes,
+so the seeded database is indistinguishable from a real one. Running it
+again appends more rows.
+"""
+import argparse
+import random
+import time
+from datetime import date, timedelta
+from itertools import islice
+
+from database import DB_PATH, Database
+from entities import GENDERS
+
+BATCH_ROWS = 50000
+FIRST_NAMES = ['Ali', 'Sara', 'Omar', 'Ayesha', 'Bilal', 'Fatima', 'Hamza', 'Zainab', 'Usman', 'Maryam',
+               'John', 'Emma', 'Liam', 'Olivia', 'Noah', 'Ava', 'Lucas', 'Mia', 'Ethan', 'Sofia']
+LAST_NAMES = ['Khan', 'Ahmed', 'Malik', 'Hussain', 'Sheikh', 'Smith', 'Brown', 'Garcia', 'Miller', 'Wilson',
+              'Taylor', 'Lee', 'Walker', 'Hall', 'Young', 'King']
+SUBJECTS = ['Mathematics', 'Physics', 'Chemistry', 'Biology', 'English', 'History', 'Computer Science', 'Economics']
+QUALIFICATIONS = ['BSc', 'MSc', 'MPhil', 'PhD']
+DURATIONS = ['3 months', '6 months', '1 year']
+EXAM_SLOTS = [('09:00', '12:00'), ('13:00', '16:00')]
+
+
+def _name(rng):
+    return f"{rng.choice(FIRST_NAMES)} {rng.choice(LAST_NAMES)}"
+
+
+def _phone(rng):
+    return f"03{rng.randrange(10 ** 9):09d}"
+
+
+def students(rng, start, count):
+    for n in range(start, start + count):
+        yield _name(rng), rng.randint(16, 40), rng.choice(GENDERS), _phone(rng), f"student{n}@example.edu"
+
+
+def teachers(rng, start, count):
+    for n in range(start, start + count):
+        yield (_name(rng), rng.choice(SUBJECTS), f"teacher{n}@example.edu", _phone(rng),
+               rng.choice(QUALIFICATIONS), f"{rng.randint(1, 999)} Campus Road")
+
+
+def courses(rng, start, count):
+    for n in range(start, start + count):
+        yield f"{rng.choice(SUBJECTS)} {n}", float(rng.randrange(50, 500, 5)), rng.choice(DURATIONS)
+
+
+def departments(rng, start, count):
+    for n in range(start, start + count):
+        yield (f"Department {n}",)
+
+
+def exams(rng, start, count, first_day):
+    # Two non-overlapping slots a day, so the seeded timetable has no clashes
+    for n in range(start, start + count):
+        day, slot = divmod(n, len(EXAM_SLOTS))
+        start_time, end_time = EXAM_SLOTS[slot]
+        yield (f"Exam {n}", str(first_day + timedelta(days=day)), start_time, end_time,
+               f"{start_time}-{end_time}", 100.0)
+
+
+def registrations(rng, count, ids, days):
+    today = date.today()
+    for _ in range(count):
+        yield (rng.randint(*ids['students']), rng.randint(*ids['teachers']), rng.randint(*ids['courses']),
+               str(today - timedelta(days=rng.randrange(days))))
+
+
+def grades(rng, count, ids):
+    # Distinct (student, exam) pairs: sweep every student for one exam, then the next
+    first_student, last_student = ids['students']
+    first_exam, last_exam = ids['exams']
+    span = last_student - first_student + 1
+    count = min(count, span * (last_exam - first_exam + 1))
+    for n in range(count):
+        exam, student = divmod(n, span)
+        yield first_student + student, first_exam + exam, round(min(100.0, max(0.0, rng.gauss(65, 15))), 1)
+
+
+TABLES = {
+    'students': 'INSERT INTO students (name, age, gender, phone, email) VALUES (?, ?, ?, ?, ?)',
+    'teachers': 'INSERT INTO teachers (name, subject, email, phone, qualification, address) VALUES (?, ?, ?, ?, ?, ?)',
+    'courses': 'INSERT INTO courses (name, fee, duration) VALUES (?, ?, ?)',
+    'departments': 'INSERT OR IGNORE INTO departments (name) VALUES (?)',
+    'exams': '''INSERT INTO exams (exam_name, exam_date, start_time, end_time, exam_time, max_marks)
+        VALUES (?, ?, ?, ?, ?, ?)''',
+    'registrations': 'INSERT INTO registrations (student_id, teacher_id, course_id, registration_date) VALUES (?, ?, ?, ?)',
+    'grades': 'INSERT OR IGNORE INTO grades (student_id, exam_id, marks) VALUES (?, ?, ?)',
+}
+
+
+def insert(db, table, rows, batch_rows=BATCH_ROWS):
+    """Insert `rows` in batches of one transaction each; returns the row count."""
+    total = 0
+    started = time.perf_counter()
+    while batch := list(islice(rows, batch_rows)):
+        db.executemany(TABLES[table], batch)
+        total += len(batch)
+        elapsed = time.perf_counter() - started
+        print(f"\r{table}: {total:,} rows ({total / elapsed:,.0f} rows/s)", end='', flush=True)
+    if total:
+        print()
+    return total
+
+
+def id_range(db, table):
+    low, high = db.fetchone(f'SELECT MIN(id), MAX(id) FROM {table}')
+    return (low, high) if low is not None else None
+
+
+def seed(db, counts, seed=None, days=365, batch_rows=BATCH_ROWS):
+    rng = random.Random(seed)
+    # Continue numbering after existing rows so unique emails/names never collide
+    start = {table: (db.scalar(f'SELECT MAX(id) FROM {table}') or 0) + 1 for table in
+             ('students', 'teachers', 'courses', 'departments', 'exams')}
+    first_day = date.today() + timedelta(days=1)
+    generators = {
+        'students': lambda n: students(rng, start['students'], n),
+        'teachers': lambda n: teachers(rng, start['teachers'], n),
+        'courses': lambda n: courses(rng, start['courses'], n),
+        'departments': lambda n: departments(rng, start['departments'], n),
+        'exams': lambda n: exams(rng, start['exams'], n, first_day),
+    }
+    for table, make in generators.items():
+        insert(db, table, make(counts[table]), batch_rows)
+
+    ids = {table: id_range(db, table) for table in ('students', 'teachers', 'courses', 'exams')}
+    if counts['registrations']:
+        if None in (ids['students'], ids['teachers'], ids['courses']):
+            raise SystemExit('registrations need at least one student, teacher and course')
+        insert(db, 'registrations', registrations(rng, counts['registrations'], ids, days), batch_rows)
+    if counts['grades']:
+        if None in (ids['students'], ids['exams']):
+            raise SystemExit('grades need at least one student and exam')
+        insert(db, 'grades', grades(rng, counts['grades'], ids), batch_rows)
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Fill a classroom database with synthetic data.')
+    parser.add_argument('--db', default=DB_PATH, help='database file (default: %(default)s)')
+    parser.add_argument('--students', type=int, default=10000)
+    parser.add_argument('--teachers', type=int, default=200)
+    parser.add_argument('--courses', type=int, default=100)
+    parser.add_argument('--departments', type=int, default=20)
+    parser.add_argument('--exams', type=int, default=500)
+    parser.add_argument('--registrations', type=int, default=50000)
+    parser.add_argument('--grades', type=int, default=50000, help='(student, exam) marks, one exam at a time')
+    parser.add_argument('--days', type=int, default=365, help='spread registration dates over this many past days')
+    parser.add_argument('--seed', type=int, help='random seed for reproducible data')
+    parser.add_argument('--batch', type=int, default=BATCH_ROWS, help='rows per insert transaction')
+    args = parser.parse_args()
+
+    db = Database(args.db)
+    counts = {table: getattr(args, table) for table in TABLES}
+    started = time.perf_counter()
+    try:
+        seed(db, counts, args.seed, args.days, args.batch)
+    finally:
+        db.close()
+    print(f"Seeded {args.db} in {time.perf_counter() - started:.1f}s")
+
+
+if __name__ == '__main__':
+    main()
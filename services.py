@@ -0,0 +1,214 @@
+"""Create/read/update/delete and registration logic, independent of the UI.
+
+Shared by the Streamlit app, the command line (cli.py) and the HTTP API
+(api.py). Batch functions write everything in one transaction on the
+background writer: the batch is applied whole or not at all.
+"""
+import json
+import sqlite3
+from datetime import date, datetime
+
+from entities import ENTITIES, GENDERS, MIN_AGE
+from queries import delete_records, fetch_page, get_record
+from timetable import TIME_FORMAT, write_exam
+
+REGISTRATION_COLUMNS = ('student_id', 'teacher_id', 'course_id', 'registration_date')
+
+
+class Conflict(Exception):
+    """The write would break a rule other than a constraint (e.g. an exam clash)."""
+
+
+def entity(table):
+    try:
+        return ENTITIES[table]
+    except KeyError:
+        raise LookupError(f"unknown table {table!r}") from None
+
+
+def records(df):
+    """DataFrame rows as dicts of plain Python values (None for missing)."""
+    return df.astype(object).where(df.notna(), None).to_dict('records')
+
+
+def _checked(target, record, partial=False):
+    # Only the entity's own columns may be written; the id is assigned by SQLite
+    if not isinstance(record, dict):
+        raise ValueError(f"expected an object, got {type(record).__name__}")
+    unknown = set(record) - set(target.columns[1:])
+    if unknown:
+        raise ValueError(f"unknown {target.table} field(s): {', '.join(sorted(unknown))}")
+    if not record and partial:
+        raise ValueError("nothing to update")
+    if target.table == 'students':
+        _student(record, partial)
+    elif target.table == 'courses':
+        _number(record, 'fee', 'at least 0', lambda fee: fee >= 0, required=not partial)
+    elif target.table == 'exams' and record.get('max_marks') is not None:
+        _number(record, 'max_marks', 'above 0', lambda marks: marks > 0)
+    return record
+
+
+def _number(record, column, rule, check, required=False):
+    # Numbers only: text in a REAL column breaks every report that reads it
+    if column not in record and not required:
+        return
+    value = record.get(column)
+    if isinstance(value, bool) or not isinstance(value, (int, float)) or not check(value):
+        raise ValueError(f"{column} must be a number {rule}")
+
+
+def _student(record, partial):
+    # The same rules as the student forms and the CSV import
+    if 'gender' in record or not partial:
+        if record.get('gender') not in GENDERS:
+            raise ValueError(f"gender must be one of {', '.join(GENDERS)}")
+    age = record.get('age')
+    if age is not None and (isinstance(age, bool) or not isinstance(age, int) or age < MIN_AGE):
+        raise ValueError(f"age must be a whole number of at least {MIN_AGE}")
+
+
+def _exam(conn, exam_id, exam):
+    for column in ('exam_name', 'exam_date', 'start_time', 'end_time'):
+        if not exam.get(column):
+            raise ValueError(f"exams need {column}")
+    try:
+        start, end = (datetime.strptime(exam[column], TIME_FORMAT) for column in ('start_time', 'end_time'))
+        date.fromisoformat(exam['exam_date'])
+    except (TypeError, ValueError):
+        raise ValueError("exam_date must be YYYY-MM-DD and times HH:MM") from None
+    if end <= start:
+        raise ValueError("end_time must be after start_time")
+    exam_id, clash = write_exam(conn, exam_id, exam['exam_name'], exam['exam_date'], exam['start_time'],
+                                exam['end_time'], 100.0 if exam.get('max_marks') is None else exam['max_marks'])
+    if clash:
+        raise Conflict(f"clashes with {clash['exam_name']} ({clash['start_time']}-{clash['end_time']}) "
+                       f"on {exam['exam_date']}")
+    return exam_id
+
+
+def _batch(rows, write):
+    # Runs on the writer; names the failing row so a client can fix its batch
+    def apply(conn):
+        ids = []
+        for index, row in enumerate(rows):
+            try:
+                ids.append(write(conn, row))
+            except (sqlite3.Error, ValueError, Conflict) as error:
+                if len(rows) == 1:
+                    raise
+                raise type(error)(f"row {index}: {error}") from error
+        return ids
+    return apply
+
+
+# ======================= ENTITIES =======================
+def create_many(db, table, rows):
+    """Insert `rows` (dicts of column values) in one transaction; returns their ids."""
+    target = entity(table)
+    rows = [_checked(target, row) for row in rows]
+    if table == 'exams':
+        write = lambda conn, row: _exam(conn, None, row)
+    else:
+        def write(conn, row):
+            columns = ', '.join(row)
+            marks = ', '.join('?' * len(row))
+            return conn.execute(f"INSERT INTO {table} ({columns}) VALUES ({marks})", tuple(row.values())).lastrowid
+    return db.submit(_batch(rows, write)).result()
+
+
+def create(db, table, row):
+    return create_many(db, table, [row])[0]
+
+
+def update(db, table, record_id, changes):
+    """Apply `changes` to one row and return it as updated."""
+    target = entity(table)
+    changes = _checked(target, changes, partial=True)
+
+    def write(conn):
+        if table == 'exams':
+            columns = target.columns[1:]
+            current = conn.execute(f"SELECT {', '.join(columns)} FROM exams WHERE id = ?", (record_id,)).fetchone()
+            if current is None:
+                raise LookupError(f"exams #{record_id} not found")
+            _exam(conn, record_id, {**dict(zip(columns, current)), **changes})
+            return
+        assignments = ', '.join(f"{column} = ?" for column in changes)
+        cursor = conn.execute(f"UPDATE {table} SET {assignments} WHERE id = ?", (*changes.values(), record_id))
+        if not cursor.rowcount:
+            raise LookupError(f"{table} #{record_id} not found")
+    db.submit(write).result()
+    return get(db, table, record_id)
+
+
+def delete(db, table, ids):
+    """Delete rows by id (with their dependants); returns how many were deleted."""
+    return delete_records(db, entity(table), ids)
+
+
+def get(db, table, record_id):
+    record = get_record(db, entity(table), record_id)
+    if record is None:
+        raise LookupError(f"{table} #{record_id} not found")
+    return record
+
+
+def list_page(db, table, sort='id', descending=False, after=None, limit=50):
+    """One keyset page as (records, cursor for the next page or None)."""
+    if limit < 1:
+        # SQLite reads a negative LIMIT as "no limit"
+        raise ValueError("limit must be at least 1")
+    target = entity(table)
+    page = records(fetch_page(db, target, sort, descending, after, limit + 1))
+    more = len(page) > limit
+    page = page[:limit]
+    return page, ([page[-1][sort], page[-1]['id']] if more else None)
+
+
+# ======================= REGISTRATIONS =======================
+def _registration(row):
+    if not isinstance(row, dict):
+        raise ValueError(f"expected an object, got {type(row).__name__}")
+    unknown = set(row) - set(REGISTRATION_COLUMNS)
+    if unknown:
+        raise ValueError(f"unknown registration field(s): {', '.join(sorted(unknown))}")
+    missing = [column for column in REGISTRATION_COLUMNS[:3] if row.get(column) is None]
+    if missing:
+        raise ValueError(f"registrations need {', '.join(missing)}")
+    try:
+        ids = tuple(int(row[column]) for column in REGISTRATION_COLUMNS[:3])
+    except (TypeError, ValueError):
+        raise ValueError("student_id, teacher_id and course_id must be integers") from None
+    registered = row.get('registration_date')
+    try:
+        registered = date.fromisoformat(registered).isoformat() if registered else date.today().isoformat()
+    except (TypeError, ValueError):
+        raise ValueError("registration_date must be YYYY-MM-DD") from None
+    return ids + (registered,)
+
+
+def register_many(db, rows):
+    """Register students in one transaction; unknown student/teacher/course ids
+    fail the batch through the foreign keys. Returns the registration ids."""
+    rows = [_registration(row) for row in rows]
+    write = lambda conn, row: conn.execute('''INSERT INTO registrations
+        (student_id, teacher_id, course_id, registration_date) VALUES (?, ?, ?, ?)''', row).lastrowid
+    return db.submit(_batch(rows, write)).result()
+
+
+def register(db, student_id, teacher_id, course_id, registration_date=None):
+    return register_many(db, [{'student_id': student_id, 'teacher_id': teacher_id, 'course_id': course_id,
+                               'registration_date': registration_date}])[0]
+
+
+def parse_rows(text):
+    """A JSON array, a single JSON object or JSON lines, as a list of dicts."""
+    text = text.strip()
+    if not text:
+        return []
+    try:
+        rows = json.loads(text)
+    except json.JSONDecodeError:
+        rows = [json.loads(line) for line in text.splitlines() if line.strip()]
+    return rows if isinstance(rows, list) else [rows]
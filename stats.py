@@ -0,0 +1,25 @@
+from cache import bump_versions
+from migrations import STAT_TABLES
+
+
+def read_stats(db):
+    """All dashboard counters in one query, as {table: count}."""
+    counts = dict(db.fetchall('SELECT name, value FROM stats'))
+    return {table: counts.get(table, 0) for table in STAT_TABLES}
+
+
+def table_count(db, table):
+    return db.scalar('SELECT value FROM stats WHERE name = ?', (table,)) or 0
+
+
+def recompute_stats(db):
+    """Rebuild the counters from the tables themselves, in case they drift."""
+    def recompute(conn):
+        for table in STAT_TABLES:
+            conn.execute(f'INSERT OR REPLACE INTO stats (name, value) SELECT ?, COUNT(*) FROM {table}', (table,))
+        # Archived registrations still count (archive.py)
+        conn.execute('''UPDATE stats SET value = value + (SELECT COALESCE(SUM(registrations), 0) FROM registration_archives)
+            WHERE name = ?''', ('registrations',))
+        bump_versions(conn, STAT_TABLES)
+    db.submit(recompute).result()
+    return read_stats(db)
@@ -1,8 +1,25 @@
 import streamlit as st
 import sqlite3
-import pandas as pd
-from datetime import datetime
-import time
+import plotly.express as px
+from datetime import datetime, time
+
+from analytics import daily_series, enrollment_by_course, rebuild_summaries, teacher_load
+from archive import MAX_ATTACHED, archive_registrations, archived_years, registration_history
+from components import (ADD, DELETE, IMPORT, SEARCH, SECTIONS, TIMETABLE, UPDATE, VIEW, bulk_delete_panel,
+                        entity_picker, import_panel, paginated_table, query_profile_panel, search_table,
+                        section_tabs)
+from database import DB_PATH, Database
+from entities import COURSES, DEPARTMENTS, EXAMS, GENDERS, MIN_AGE, STUDENTS, TEACHERS
+from exporter import DOWNLOAD_MAX_ROWS, EXPORT_SOURCES, FORMATS, browser_download, check_format, export_rows
+from gradebook import (GRADE_LETTERS, PERCENTILES, cohort_gpa, exam_grades, exam_results, save_exam_grades,
+                       unknown_students)
+from migrations import STAT_TABLES
+from profiler import start_rerun
+from queries import get_record
+from search import rebuild_search_index
+from services import Conflict, create, delete, register, update
+from stats import read_stats, recompute_stats
+from timetable import TIME_FORMAT, timetable_clashes, unscheduled_exams
 
 # ======================= PAGE CONFIG & BEAUTIFUL THEME =======================
 st.set_page_config(page_title="Education Management System", page_icon="🎓", layout="wide", initial_sidebar_state="expanded")
@@ -59,52 +76,55 @@ with col2:
 st.markdown("---")
 
 # ======================= DATABASE =======================
-conn = sqlite3.connect('classroom.db', check_same_thread=False)
-cursor = conn.cursor()
-
-# Tables (no department in courses, no course_id in exams/grades, no timetable)
-cursor.execute('''CREATE TABLE IF NOT EXISTS departments (id INTEGER PRIMARY KEY AUTOINCREMENT, name TEXT NOT NULL UNIQUE)''')
-cursor.execute('''CREATE TABLE IF NOT EXISTS courses (
-    id INTEGER PRIMARY KEY AUTOINCREMENT,
-    name TEXT NOT NULL,
-    fee REAL NOT NULL,
-    duration TEXT
-)''')
-cursor.execute('''CREATE TABLE IF NOT EXISTS teachers (
-    id INTEGER PRIMARY KEY AUTOINCREMENT,
-    name TEXT NOT NULL,
-    subject TEXT,
-    email TEXT UNIQUE,
-    phone TEXT,
-    qualification TEXT,
-    address TEXT
-)''')
-cursor.execute('''CREATE TABLE IF NOT EXISTS students (id INTEGER PRIMARY KEY AUTOINCREMENT, name TEXT NOT NULL, age INTEGER, gender TEXT, phone TEXT, email TEXT UNIQUE)''')
-cursor.execute('''CREATE TABLE IF NOT EXISTS exams (
-    id INTEGER PRIMARY KEY AUTOINCREMENT,
-    exam_name TEXT NOT NULL,
-    exam_date TEXT NOT NULL,
-    exam_time TEXT NOT NULL
-)''')
-
-cursor.execute('''CREATE TABLE IF NOT EXISTS registrations (
-    id INTEGER PRIMARY KEY AUTOINCREMENT,
-    student_id INTEGER,
-    teacher_id INTEGER,
-    course_id INTEGER,
-    registration_date TEXT,
-    FOREIGN KEY(student_id) REFERENCES students(id),
-    FOREIGN KEY(teacher_id) REFERENCES teachers(id),
-    FOREIGN KEY(course_id) REFERENCES courses(id)
-)''')
-conn.commit()
-
-# Success message with 2-second delay
+# Streamlit re-runs this script on every interaction; the connection pool and
+# the schema migrations are set up once per process and shared by every session.
+@st.cache_resource
+def get_db():
+    return Database(DB_PATH)
+
+db = get_db()
+
+# Cached reads are shared by every session and stay valid until a write to
+# one of the tables they read from, from any session or replica (cache.py).
+@db.cache.memoize(*STAT_TABLES)
+def load_stats():
+    return read_stats(db)
+
+# Registration analytics read small trigger-maintained summary tables
+@db.cache.memoize('registrations', 'courses', 'teachers')
+def load_enrollment():
+    return enrollment_by_course(db)
+
+@db.cache.memoize('registrations', 'teachers')
+def load_teacher_load():
+    return teacher_load(db)
+
+@db.cache.memoize('registrations', 'courses')
+def load_daily_series(start, end):
+    return daily_series(db, start, end)
+
+# Registration history unions the live table with the archive files (archive.py)
+@db.cache.memoize('registrations', 'students', 'teachers', 'courses')
+def load_registration_history(start, end):
+    return registration_history(db, start, end)
+
+# Gradebook reads are columnar
+@db.cache.memoize('grades', 'students')
+def load_exam_grades(exam_id):
+    return exam_grades(db, exam_id)
+
+@db.cache.memoize('grades', 'students', 'exams')
+def load_cohort_gpa():
+    return cohort_gpa(db)
+
+# Success message shown as a toast after the rerun, without holding the script thread
 def success_message(action, item):
-    st.success(f"{item} {action} successfully!")
-    time.sleep(2)
+    st.session_state["flash"] = f"{item} {action} successfully!"
     st.rerun()
 
+if "flash" in st.session_state:
+    st.toast(st.session_state.pop("flash"), icon="✅")
+
 # ======================= SIDEBAR =======================
 with st.sidebar:
     st.markdown("### Navigation")
@@ -115,60 +135,77 @@ with st.sidebar:
         "Courses",
         "Departments",
         "Exams",
-        "Registration Form"
+        "Registration Form",
+        "Registrations",
+        "Gradebook",
+        "Data Export"
     ], label_visibility="collapsed")
     st.markdown("---")
+    show_profiler = st.toggle("🔬 Query profiler", key="show_profiler")
     st.caption("Professional Education Platform • 2025")
 
+# Every statement from here on is attributed to this page (and its section)
+rerun = start_rerun(page)
+
 # ======================= COLORFUL DASHBOARD =======================
 if page == "Dashboard":
     st.header("System Overview")
+    counts = load_stats()
 
     col1, col2, col3, col4 = st.columns(4)
     with col1:
         st.markdown("<div class='metric-card' style='border-left-color: #3b82f6;'>", unsafe_allow_html=True)
         st.markdown("### 👥 Students")
-        st.markdown(f"<h2 style='color: #3b82f6;'>{pd.read_sql('SELECT COUNT(*) FROM students', conn).iloc[0,0]}</h2>", unsafe_allow_html=True)
+        st.markdown(f"<h2 style='color: #3b82f6;'>{counts['students']}</h2>", unsafe_allow_html=True)
         st.markdown("</div>", unsafe_allow_html=True)
     with col2:
         st.markdown("<div class='metric-card' style='border-left-color: #10b981;'>", unsafe_allow_html=True)
         st.markdown("### 👩‍🏫 Teachers")
-        st.markdown(f"<h2 style='color: #10b981;'>{pd.read_sql('SELECT COUNT(*) FROM teachers', conn).iloc[0,0]}</h2>", unsafe_allow_html=True)
+        st.markdown(f"<h2 style='color: #10b981;'>{counts['teachers']}</h2>", unsafe_allow_html=True)
         st.markdown("</div>", unsafe_allow_html=True)
     with col3:
         st.markdown("<div class='metric-card' style='border-left-color: #f59e0b;'>", unsafe_allow_html=True)
         st.markdown("### 📚 Courses")
-        st.markdown(f"<h2 style='color: #f59e0b;'>{pd.read_sql('SELECT COUNT(*) FROM courses', conn).iloc[0,0]}</h2>", unsafe_allow_html=True)
+        st.markdown(f"<h2 style='color: #f59e0b;'>{counts['courses']}</h2>", unsafe_allow_html=True)
         st.markdown("</div>", unsafe_allow_html=True)
     with col4:
         st.markdown("<div class='metric-card' style='border-left-color: #ef4444;'>", unsafe_allow_html=True)
         st.markdown("### 🏢 Departments")
-        st.markdown(f"<h2 style='color: #ef4444;'>{pd.read_sql('SELECT COUNT(*) FROM departments', conn).iloc[0,0]}</h2>", unsafe_allow_html=True)
+        st.markdown(f"<h2 style='color: #ef4444;'>{counts['departments']}</h2>", unsafe_allow_html=True)
         st.markdown("</div>", unsafe_allow_html=True)
 
     col1, col2 = st.columns(2)
     with col1:
         st.markdown("<div class='metric-card' style='border-left-color: #8b5cf6;'>", unsafe_allow_html=True)
         st.markdown("### 📝 Registrations")
-        st.markdown(f"<h2 style='color: #8b5cf6;'>{pd.read_sql('SELECT COUNT(*) FROM registrations', conn).iloc[0,0]}</h2>", unsafe_allow_html=True)
+        st.markdown(f"<h2 style='color: #8b5cf6;'>{counts['registrations']}</h2>", unsafe_allow_html=True)
         st.markdown("</div>", unsafe_allow_html=True)
     with col2:
         st.markdown("<div class='metric-card' style='border-left-color: #ec4899;'>", unsafe_allow_html=True)
         st.markdown("### 📅 Scheduled Exams")
-        st.markdown(f"<h2 style='color: #ec4899;'>{pd.read_sql('SELECT COUNT(*) FROM exams', conn).iloc[0,0]}</h2>", unsafe_allow_html=True)
+        st.markdown(f"<h2 style='color: #ec4899;'>{counts['exams']}</h2>", unsafe_allow_html=True)
         st.markdown("</div>", unsafe_allow_html=True)
 
+    col1, col2 = st.columns(2)
+    with col1:
+        if st.button("🔄 Recompute Counters"):
+            recompute_stats(db)
+            st.rerun()
+    with col2:
+        if st.button("🔎 Rebuild Search Index"):
+            rebuild_search_index(db)
+            success_message("rebuilt", "Search index")
+
 # ======================= STUDENTS =======================
 elif page == "Students":
     st.header("Student Management")
 
-    tab_view, tab_add, tab_update, tab_search, tab_delete = st.tabs(["📋 View", "➕ Add", "✏️ Update", "🔍 Search", "🗑️ Delete"])
+    section = section_tabs(SECTIONS + [IMPORT], key="students_section")
 
-    with tab_view:
-        df_students = pd.read_sql("SELECT id, name, email, phone, age, gender FROM students", conn)
-        st.dataframe(df_students, use_container_width=True)
+    if section == VIEW:
+        paginated_table(db, STUDENTS, key="students_view")
 
-    with tab_add:
+    elif section == ADD:
         with st.form("add_student"):
             col1, col2 = st.columns(2)
             with col1:
@@ -176,22 +213,20 @@ elif page == "Students":
                 email = st.text_input("Email")
                 phone = st.text_input("Phone")
             with col2:
-                age = st.number_input("Age", min_value=1)
-                gender = st.selectbox("Gender", ["Male", "Female", "Other"])
+                age = st.number_input("Age", min_value=MIN_AGE)
+                gender = st.selectbox("Gender", GENDERS)
             submitted = st.form_submit_button("Add Student")
             if submitted and name and email:
                 try:
-                    cursor.execute("INSERT INTO students (name, age, gender, phone, email) VALUES (?, ?, ?, ?, ?)", (name, age, gender, phone, email))
-                    conn.commit()
+                    create(db, "students", {"name": name, "age": age, "gender": gender, "phone": phone, "email": email})
                     success_message("added", "Student")
                 except sqlite3.IntegrityError:
                     st.error("Email already exists.")
 
-    with tab_update:
-        df_students = pd.read_sql("SELECT id, name, email, phone, age, gender FROM students", conn)
-        if not df_students.empty:
-            student_id = st.selectbox("Select Student ID to Update", df_students['id'])
-            current = df_students[df_students['id'] == student_id].iloc[0]
+    elif section == UPDATE:
+        student_id = entity_picker(db, STUDENTS, "Find Student to Update", key="students_update")
+        current = get_record(db, STUDENTS, student_id) if student_id else None
+        if current:
             with st.form("update_student"):
                 col1, col2 = st.columns(2)
                 with col1:
@@ -199,46 +234,52 @@ elif page == "Students":
                     new_email = st.text_input("Email", value=current['email'])
                     new_phone = st.text_input("Phone", value=current['phone'])
                 with col2:
-                    new_age = st.number_input("Age", value=current['age'], min_value=1)
-                    new_gender = st.selectbox("Gender", ["Male", "Female", "Other"], index=["Male", "Female", "Other"].index(current['gender']))
+                    # Rows imported before gender/age were validated may hold no or odd values
+                    age = current['age'] if isinstance(current['age'], int) and current['age'] >= MIN_AGE else None
+                    new_age = st.number_input("Age", value=age, min_value=MIN_AGE)
+                    new_gender = st.selectbox("Gender", GENDERS, placeholder="Choose a gender",
+                                              index=GENDERS.index(current['gender']) if current['gender'] in GENDERS else None)
                 submitted = st.form_submit_button("Update Student")
                 if submitted:
-                    cursor.execute("UPDATE students SET name = ?, age = ?, gender = ?, phone = ?, email = ? WHERE id = ?", 
-                                   (new_name, new_age, new_gender, new_phone, new_email, student_id))
-                    conn.commit()
-                    success_message("updated", "Student")
-
-    with tab_search:
-        search = st.text_input("Search by name, email, or phone")
-        if search:
-            df_search = pd.read_sql("SELECT id, name, email, phone, age, gender FROM students WHERE name LIKE ? OR email LIKE ? OR phone LIKE ?", conn, params=(f"%{search}%", f"%{search}%", f"%{search}%"))
-            st.dataframe(df_search, use_container_width=True)
-
-    with tab_delete:
-        df_students = pd.read_sql("SELECT id, name FROM students", conn)
-        if not df_students.empty:
-            student_id = st.selectbox("Select Student ID to Delete", df_students['id'])
-            student_name = df_students[df_students['id'] == student_id]['name'].iloc[0]
+                    try:
+                        update(db, "students", student_id, {"name": new_name, "age": new_age, "gender": new_gender,
+                                                            "phone": new_phone, "email": new_email})
+                        success_message("updated", "Student")
+                    except ValueError as error:
+                        st.error(f"Invalid student: {error}.")
+
+    elif section == SEARCH:
+        search_table(db, STUDENTS, "Search by name, email, or phone", key="students_search")
+
+    elif section == DELETE:
+        student_id = entity_picker(db, STUDENTS, "Find Student to Delete", key="students_delete")
+        current = get_record(db, STUDENTS, student_id) if student_id else None
+        if current:
+            student_name = current['name']
             if st.button("🛑 Permanently Delete", type="primary"):
-                cursor.execute("DELETE FROM students WHERE id = ?", (student_id,))
-                cursor.execute("DELETE FROM registrations WHERE student_id = ?", (student_id,))
-                cursor.execute("DELETE FROM grades WHERE student_id = ?", (student_id,))
-                conn.commit()
+                # Registrations and grades are removed by the cascade triggers
+                delete(db, "students", [student_id])
                 success_message("deleted", f"Student ({student_name})")
+        with st.expander("🧹 Bulk delete"):
+            deleted = bulk_delete_panel(db, STUDENTS, key="students_bulk_delete")
+            if deleted is not None:
+                success_message("deleted", f"{deleted} student record(s)")
+
+    elif section == IMPORT:
+        import_panel(db, "students", key="students_import")
 
 # ======================= TEACHERS =======================
 elif page == "Teachers":
     st.header("Teacher Management")
 
-    tab_view, tab_add, tab_update, tab_search, tab_delete = st.tabs(["📋 View", "➕ Add", "✏️ Update", "🔍 Search", "🗑️ Delete"])
+    section = section_tabs(SECTIONS + [IMPORT], key="teachers_section")
 
-    with tab_view:
-        df_teachers = pd.read_sql("SELECT id, name, subject, email, phone, qualification, address FROM teachers", conn)
-        st.dataframe(df_teachers, use_container_width=True)
-        if st.button("➕ Add New Teacher", use_container_width=True):
-            st.rerun()
+    if section == VIEW:
+        paginated_table(db, TEACHERS, key="teachers_view")
+        st.button("➕ Add New Teacher", use_container_width=True,
+                  on_click=lambda: st.session_state.update(teachers_section=ADD))
 
-    with tab_add:
+    elif section == ADD:
         with st.form("add_teacher"):
             col1, col2 = st.columns(2)
             with col1:
@@ -252,20 +293,16 @@ elif page == "Teachers":
             submitted = st.form_submit_button("Add Teacher")
             if submitted and name and email:
                 try:
-                    cursor.execute("""INSERT INTO teachers 
-                        (name, subject, email, phone, qualification, address) 
-                        VALUES (?, ?, ?, ?, ?, ?)""", 
-                        (name, subject, email, phone, qualification, address))
-                    conn.commit()
+                    create(db, "teachers", {"name": name, "subject": subject, "email": email, "phone": phone,
+                                            "qualification": qualification, "address": address})
                     success_message("added", "Teacher")
                 except sqlite3.IntegrityError:
                     st.error("Email already exists or duplicate entry.")
 
-    with tab_update:
-        df_teachers = pd.read_sql("SELECT id, name, subject, email, phone, qualification, address FROM teachers", conn)
-        if not df_teachers.empty:
-            teacher_id = st.selectbox("Select Teacher ID to Update", df_teachers['id'])
-            current = df_teachers[df_teachers['id'] == teacher_id].iloc[0]
+    elif section == UPDATE:
+        teacher_id = entity_picker(db, TEACHERS, "Find Teacher to Update", key="teachers_update")
+        current = get_record(db, TEACHERS, teacher_id) if teacher_id else None
+        if current:
             with st.form("update_teacher"):
                 col1, col2 = st.columns(2)
                 with col1:
@@ -278,222 +315,427 @@ elif page == "Teachers":
                     new_address = st.text_area("Address", value=current['address'])
                 submitted = st.form_submit_button("Update Teacher")
                 if submitted:
-                    cursor.execute("""UPDATE teachers 
-                        SET name = ?, subject = ?, email = ?, phone = ?, qualification = ?, address = ? 
-                        WHERE id = ?""", 
-                        (new_name, new_subject, new_email, new_phone, new_qualification, new_address, teacher_id))
-                    conn.commit()
+                    update(db, "teachers", teacher_id, {"name": new_name, "subject": new_subject, "email": new_email,
+                                                        "phone": new_phone, "qualification": new_qualification,
+                                                        "address": new_address})
                     success_message("updated", "Teacher")
                     st.rerun()
-        else:
-            st.info("No teachers to update.")
-
-    with tab_search:
-        search = st.text_input("Search by name, email, subject, or qualification")
-        if search:
-            df_search = pd.read_sql("""SELECT id, name, subject, email, phone, qualification, address 
-                FROM teachers 
-                WHERE name LIKE ? OR email LIKE ? OR subject LIKE ? OR qualification LIKE ?""", 
-                conn, params=(f"%{search}%", f"%{search}%", f"%{search}%", f"%{search}%"))
-            st.dataframe(df_search, use_container_width=True)
-
-    with tab_delete:
-        df_teachers = pd.read_sql("SELECT id, name FROM teachers", conn)
-        if not df_teachers.empty:
-            teacher_id = st.selectbox("Select Teacher ID to Delete", df_teachers['id'])
-            teacher_name = df_teachers[df_teachers['id'] == teacher_id]['name'].iloc[0]
+
+    elif section == SEARCH:
+        search_table(db, TEACHERS, "Search by name, email, subject, or qualification", key="teachers_search")
+
+    elif section == DELETE:
+        teacher_id = entity_picker(db, TEACHERS, "Find Teacher to Delete", key="teachers_delete")
+        current = get_record(db, TEACHERS, teacher_id) if teacher_id else None
+        if current:
+            teacher_name = current['name']
             if st.button("🛑 Permanently Delete", type="primary"):
-                cursor.execute("DELETE FROM teachers WHERE id = ?", (teacher_id,))
-                conn.commit()
+                delete(db, "teachers", [teacher_id])
                 success_message("deleted", f"Teacher ({teacher_name})")
                 st.rerun()
-        else:
-            st.info("No teachers to delete.")
+        with st.expander("🧹 Bulk delete"):
+            deleted = bulk_delete_panel(db, TEACHERS, key="teachers_bulk_delete")
+            if deleted is not None:
+                success_message("deleted", f"{deleted} teacher record(s)")
+
+    elif section == IMPORT:
+        import_panel(db, "teachers", key="teachers_import")
 
 # ======================= COURSES (NO DEPARTMENT COLUMN) =======================
 elif page == "Courses":
     st.header("Course Management")
 
-    tab_view, tab_add, tab_update, tab_search, tab_delete = st.tabs(["📋 View", "➕ Add", "✏️ Update", "🔍 Search", "🗑️ Delete"])
+    section = section_tabs(SECTIONS + [IMPORT], key="courses_section")
 
-    with tab_view:
-        df_courses = pd.read_sql("SELECT id, name, fee, duration FROM courses", conn)
-        st.dataframe(df_courses, use_container_width=True)
+    if section == VIEW:
+        paginated_table(db, COURSES, key="courses_view")
 
-    with tab_add:
+    elif section == ADD:
         with st.form("add_course"):
             name = st.text_input("Course Name")
             fee = st.number_input("Course Fee", min_value=0.0)
             duration = st.text_input("Course Duration (e.g., 3 months)")
             submitted = st.form_submit_button("Add Course")
             if submitted and name:
-                cursor.execute("INSERT INTO courses (name, fee, duration) VALUES (?, ?, ?)", (name, fee, duration))
-                conn.commit()
+                create(db, "courses", {"name": name, "fee": fee, "duration": duration})
                 success_message("added", "Course")
 
-    with tab_update:
-        df_courses = pd.read_sql("SELECT id, name, fee, duration FROM courses", conn)
-        if not df_courses.empty:
-            course_id = st.selectbox("Select Course ID to Update", df_courses['id'])
-            current = df_courses[df_courses['id'] == course_id].iloc[0]
+    elif section == UPDATE:
+        course_id = entity_picker(db, COURSES, "Find Course to Update", key="courses_update")
+        current = get_record(db, COURSES, course_id) if course_id else None
+        if current:
             with st.form("update_course"):
                 new_name = st.text_input("Course Name", value=current['name'])
                 new_fee = st.number_input("Fee", value=float(current['fee']))
                 new_duration = st.text_input("Duration", value=current['duration'] or "")
                 submitted = st.form_submit_button("Update Course")
                 if submitted:
-                    cursor.execute("UPDATE courses SET name = ?, fee = ?, duration = ? WHERE id = ?", (new_name, new_fee, new_duration, course_id))
-                    conn.commit()
+                    update(db, "courses", course_id, {"name": new_name, "fee": new_fee, "duration": new_duration})
                     success_message("updated", "Course")
 
-    with tab_search:
-        search = st.text_input("Search by name")
-        if search:
-            df_search = pd.read_sql("SELECT id, name, fee, duration FROM courses WHERE name LIKE ?", conn, params=(f"%{search}%",))
-            st.dataframe(df_search, use_container_width=True)
-
-    with tab_delete:
-        df_courses = pd.read_sql("SELECT id, name FROM courses", conn)
-        if not df_courses.empty:
-            course_id = st.selectbox("Select Course ID to Delete", df_courses['id'])
-            course_name = df_courses[df_courses['id'] == course_id]['name'].iloc[0]
+    elif section == SEARCH:
+        search_table(db, COURSES, "Search by name", key="courses_search")
+
+    elif section == DELETE:
+        course_id = entity_picker(db, COURSES, "Find Course to Delete", key="courses_delete")
+        current = get_record(db, COURSES, course_id) if course_id else None
+        if current:
+            course_name = current['name']
             if st.button("🛑 Permanently Delete", type="primary"):
-                cursor.execute("DELETE FROM courses WHERE id = ?", (course_id,))
-                conn.commit()
+                delete(db, "courses", [course_id])
                 success_message("deleted", f"Course ({course_name})")
+        with st.expander("🧹 Bulk delete"):
+            deleted = bulk_delete_panel(db, COURSES, key="courses_bulk_delete")
+            if deleted is not None:
+                success_message("deleted", f"{deleted} course record(s)")
+
+    elif section == IMPORT:
+        import_panel(db, "courses", key="courses_import")
 
 # ======================= DEPARTMENTS =======================
 elif page == "Departments":
     st.header("Department Management")
 
-    tab_view, tab_add, tab_update, tab_search, tab_delete = st.tabs(["📋 View", "➕ Add", "✏️ Update", "🔍 Search", "🗑️ Delete"])
+    section = section_tabs(SECTIONS, key="departments_section")
 
-    with tab_view:
-        df_depts = pd.read_sql("SELECT id, name FROM departments", conn)
-        st.dataframe(df_depts, use_container_width=True)
+    if section == VIEW:
+        paginated_table(db, DEPARTMENTS, key="departments_view")
 
-    with tab_add:
+    elif section == ADD:
         with st.form("add_dept"):
             name = st.text_input("Department Name")
             submitted = st.form_submit_button("Add Department")
             if submitted and name:
                 try:
-                    cursor.execute("INSERT INTO departments (name) VALUES (?)", (name,))
-                    conn.commit()
+                    create(db, "departments", {"name": name})
                     success_message("added", "Department")
                 except sqlite3.IntegrityError:
                     st.error("Department already exists.")
 
-    with tab_update:
-        df_depts = pd.read_sql("SELECT id, name FROM departments", conn)
-        if not df_depts.empty:
-            dept_id = st.selectbox("Select Department ID to Update", df_depts['id'])
-            current = df_depts[df_depts['id'] == dept_id].iloc[0]
+    elif section == UPDATE:
+        dept_id = entity_picker(db, DEPARTMENTS, "Find Department to Update", key="departments_update")
+        current = get_record(db, DEPARTMENTS, dept_id) if dept_id else None
+        if current:
             new_name = st.text_input("Department Name", value=current['name'])
             if st.button("Update Department"):
-                cursor.execute("UPDATE departments SET name = ? WHERE id = ?", (new_name, dept_id))
-                conn.commit()
+                update(db, "departments", dept_id, {"name": new_name})
                 success_message("updated", "Department")
 
-    with tab_search:
-        search = st.text_input("Search by name")
-        if search:
-            df_search = pd.read_sql("SELECT id, name FROM departments WHERE name LIKE ?", conn, params=(f"%{search}%",))
-            st.dataframe(df_search, use_container_width=True)
-
-    with tab_delete:
-        df_depts = pd.read_sql("SELECT id, name FROM departments", conn)
-        if not df_depts.empty:
-            dept_id = st.selectbox("Select Department ID to Delete", df_depts['id'])
-            dept_name = df_depts[df_depts['id'] == dept_id]['name'].iloc[0]
+    elif section == SEARCH:
+        search_table(db, DEPARTMENTS, "Search by name", key="departments_search")
+
+    elif section == DELETE:
+        dept_id = entity_picker(db, DEPARTMENTS, "Find Department to Delete", key="departments_delete")
+        current = get_record(db, DEPARTMENTS, dept_id) if dept_id else None
+        if current:
+            dept_name = current['name']
             if st.button("🛑 Permanently Delete", type="primary"):
-                cursor.execute("DELETE FROM departments WHERE id = ?", (dept_id,))
-                conn.commit()
+                delete(db, "departments", [dept_id])
                 success_message("deleted", f"Department ({dept_name})")
+        with st.expander("🧹 Bulk delete"):
+            deleted = bulk_delete_panel(db, DEPARTMENTS, key="departments_bulk_delete")
+            if deleted is not None:
+                success_message("deleted", f"{deleted} department record(s)")
 
 # ======================= EXAMS (NO COURSE_ID) =======================
 elif page == "Exams":
     st.header("Exam Management")
 
-    tab_view, tab_add, tab_update, tab_search, tab_delete = st.tabs(["📝 View", "➕ Add", "✏️ Update", "🔍 Search", "🗑️ Delete"])
+    section = section_tabs(SECTIONS + [TIMETABLE], key="exams_section")
 
-    with tab_view:
-        df_exams = pd.read_sql("SELECT id, exam_name, exam_date, exam_time FROM exams", conn)
-        st.dataframe(df_exams, use_container_width=True)
+    if section == VIEW:
+        paginated_table(db, EXAMS, key="exams_view")
 
-    with tab_add:
+    elif section == ADD:
         with st.form("add_exam"):
             exam_name = st.text_input("Exam Name")
             exam_date = st.date_input("Exam Date")
-            exam_time = st.text_input("Exam Time")
+            col1, col2 = st.columns(2)
+            start_time = col1.time_input("Start Time", value=time(9, 0))
+            end_time = col2.time_input("End Time", value=time(12, 0))
+            max_marks = st.number_input("Maximum Marks", min_value=1.0, value=100.0)
             submitted = st.form_submit_button("Add Exam")
             if submitted and exam_name:
-                cursor.execute("INSERT INTO exams (exam_name, exam_date, exam_time) VALUES (?, ?, ?)", (exam_name, str(exam_date), exam_time))
-                conn.commit()
-                success_message("added", "Exam")
-
-    with tab_update:
-        df_exams = pd.read_sql("SELECT id, exam_name, exam_date, exam_time FROM exams", conn)
-        if not df_exams.empty:
-            exam_id = st.selectbox("Select Exam ID to Update", df_exams['id'])
-            current = df_exams[df_exams['id'] == exam_id].iloc[0]
+                if end_time <= start_time:
+                    st.error("End time must be after the start time.")
+                else:
+                    try:
+                        create(db, "exams", {"exam_name": exam_name, "exam_date": str(exam_date),
+                                             "start_time": start_time.strftime(TIME_FORMAT),
+                                             "end_time": end_time.strftime(TIME_FORMAT), "max_marks": max_marks})
+                        success_message("added", "Exam")
+                    except Conflict as clash:
+                        st.error(f"Exam {clash}.")
+
+    elif section == UPDATE:
+        exam_id = entity_picker(db, EXAMS, "Find Exam to Update", key="exams_update")
+        current = get_record(db, EXAMS, exam_id) if exam_id else None
+        if current:
             with st.form("update_exam"):
                 new_name = st.text_input("Exam Name", value=current['exam_name'])
                 new_date = st.date_input("Exam Date", value=datetime.strptime(current['exam_date'], "%Y-%m-%d"))
-                new_time = st.text_input("Exam Time", value=current['exam_time'])
+                col1, col2 = st.columns(2)
+                new_start = col1.time_input("Start Time", value=datetime.strptime(current['start_time'] or "09:00", TIME_FORMAT).time())
+                new_end = col2.time_input("End Time", value=datetime.strptime(current['end_time'] or "12:00", TIME_FORMAT).time())
+                new_max_marks = st.number_input("Maximum Marks", min_value=1.0, value=float(current['max_marks']))
                 submitted = st.form_submit_button("Update Exam")
                 if submitted:
-                    cursor.execute("UPDATE exams SET exam_name = ?, exam_date = ?, exam_time = ? WHERE id = ?", (new_name, str(new_date), new_time, exam_id))
-                    conn.commit()
-                    success_message("updated", "Exam")
-
-    with tab_search:
-        search = st.text_input("Search by exam name")
-        if search:
-            df_search = pd.read_sql("SELECT id, exam_name, exam_date, exam_time FROM exams WHERE exam_name LIKE ?", conn, params=(f"%{search}%",))
-            st.dataframe(df_search, use_container_width=True)
-
-    with tab_delete:
-        df_exams = pd.read_sql("SELECT id, exam_name FROM exams", conn)
-        if not df_exams.empty:
-            exam_id = st.selectbox("Select Exam ID to Delete", df_exams['id'])
-            exam_name = df_exams[df_exams['id'] == exam_id]['exam_name'].iloc[0]
+                    if new_end <= new_start:
+                        st.error("End time must be after the start time.")
+                    else:
+                        try:
+                            update(db, "exams", exam_id, {"exam_name": new_name, "exam_date": str(new_date),
+                                                          "start_time": new_start.strftime(TIME_FORMAT),
+                                                          "end_time": new_end.strftime(TIME_FORMAT),
+                                                          "max_marks": new_max_marks})
+                            success_message("updated", "Exam")
+                        except Conflict as clash:
+                            st.error(f"Exam {clash}.")
+
+    elif section == SEARCH:
+        search_table(db, EXAMS, "Search by exam name", key="exams_search")
+
+    elif section == DELETE:
+        exam_id = entity_picker(db, EXAMS, "Find Exam to Delete", key="exams_delete")
+        current = get_record(db, EXAMS, exam_id) if exam_id else None
+        if current:
+            exam_name = current['exam_name']
             if st.button("🛑 Permanently Delete", type="primary"):
-                cursor.execute("DELETE FROM exams WHERE id = ?", (exam_id,))
-                conn.commit()
+                delete(db, "exams", [exam_id])
                 success_message("deleted", f"Exam ({exam_name})")
+        with st.expander("🧹 Bulk delete"):
+            deleted = bulk_delete_panel(db, EXAMS, key="exams_bulk_delete")
+            if deleted is not None:
+                success_message("deleted", f"{deleted} exam record(s)")
+
+    elif section == TIMETABLE:
+        st.caption("Checks every scheduled exam for overlaps with others on the same day.")
+        if st.button("🔍 Validate Entire Timetable"):
+            clashes = timetable_clashes(db)
+            unscheduled = unscheduled_exams(db)
+            col1, col2, col3 = st.columns(3)
+            col1.metric("Exams", f"{read_stats(db)['exams']:,}")
+            col2.metric("Clashing Exams", f"{len(clashes):,}")
+            col3.metric("Unscheduled", f"{len(unscheduled):,}")
+            if clashes.empty:
+                st.success("No clashes - the timetable is valid.")
+            else:
+                st.error(f"{len(clashes)} exam(s) overlap an earlier exam on the same day.")
+                st.dataframe(clashes, use_container_width=True, hide_index=True)
+            if not unscheduled.empty:
+                st.warning("These exams have no structured start/end time; update them to include them in the check.")
+                st.dataframe(unscheduled, use_container_width=True, hide_index=True)
 
 # ======================= REGISTRATION FORM =======================
 elif page == "Registration Form":
     st.header("Student Registration Form")
 
-    students = pd.read_sql("SELECT id, name FROM students", conn)
-    teachers = pd.read_sql("SELECT id, name FROM teachers", conn)
-    courses = pd.read_sql("SELECT id, name, fee FROM courses", conn)
-
-    if students.empty or teachers.empty or courses.empty:
+    counts = load_stats()
+    if not (counts['students'] and counts['teachers'] and counts['courses']):
         st.warning("Please add students, teachers, and courses first.")
     else:
-        with st.form("registration_form"):
-            st.subheader("Register Student in Course")
-            student_name = st.selectbox("Select Student", students['name'].tolist())
-            teacher_name = st.selectbox("Select Teacher", teachers['name'].tolist())
-            course_name = st.selectbox("Select Course", courses['name'].tolist())
-
-            selected_course = courses[courses['name'] == course_name].iloc[0]
+        st.subheader("Register Student in Course")
+        # Pickers live outside a form so the matches refresh while typing
+        col1, col2, col3 = st.columns(3)
+        with col1:
+            student_id = entity_picker(db, STUDENTS, "Select Student", key="registration_student")
+        with col2:
+            teacher_id = entity_picker(db, TEACHERS, "Select Teacher", key="registration_teacher")
+        with col3:
+            course_id = entity_picker(db, COURSES, "Select Course", key="registration_course")
+
+        selected_course = get_record(db, COURSES, course_id) if course_id else None
+        if selected_course:
             st.info(f"**Course Fee:** ${selected_course['fee']:.2f}")
 
-            submitted = st.form_submit_button("Complete Registration")
-            if submitted:
-                student_id = students[students['name'] == student_name]['id'].iloc[0]
-                teacher_id = teachers[teachers['name'] == teacher_name]['id'].iloc[0]
-                course_id = selected_course['id']
+        if st.button("Complete Registration", disabled=not (student_id and teacher_id and selected_course)):
+            register(db, student_id, teacher_id, course_id, datetime.now().strftime("%Y-%m-%d"))
+            success_message("completed", "Registration")
+
+    with st.expander("📥 Bulk import registrations"):
+        import_panel(db, "registrations", key="registrations_import")
+
+# ======================= REGISTRATIONS ANALYTICS =======================
+elif page == "Registrations":
+    st.header("Registrations Analytics")
 
-                cursor.execute("INSERT INTO registrations (student_id, teacher_id, course_id, registration_date) VALUES (?, ?, ?, ?)",
-                               (student_id, teacher_id, course_id, datetime.now().strftime("%Y-%m-%d")))
-                conn.commit()
-                success_message("completed", "Registration")
- 
+    by_course = load_enrollment()
+    by_teacher = load_teacher_load()
+    total_revenue = by_course['revenue'].sum()
 
+    col1, col2, col3, col4 = st.columns(4)
+    col1.metric("📝 Registrations", f"{load_stats()['registrations']:,}")
+    col2.metric("💰 Revenue", f"${total_revenue:,.2f}")
+    col3.metric("📚 Courses with students", f"{(by_course['registrations'] > 0).sum():,}")
+    col4.metric("👩‍🏫 Avg load per teacher", f"{by_teacher['registrations'].mean():,.1f}" if not by_teacher.empty else "0")
+
+    top_n = st.slider("Courses / teachers to chart", 5, 50, 15)
+    if by_course.empty:
+        st.info("No courses yet.")
+    else:
+        col1, col2 = st.columns(2)
+        with col1:
+            st.plotly_chart(px.bar(by_course.head(top_n), x="course", y="registrations", title="Enrollment by Course",
+                                   hover_data=["fee", "revenue"]), use_container_width=True)
+        with col2:
+            st.plotly_chart(px.bar(by_course.nlargest(top_n, "revenue"), x="course", y="revenue", title="Revenue by Course",
+                                   color_discrete_sequence=["#10b981"]), use_container_width=True)
+    if by_teacher.empty:
+        st.info("No teachers yet.")
+    else:
+        st.plotly_chart(px.bar(by_teacher.head(top_n), x="teacher", y="registrations", title="Teacher Load",
+                               hover_data=["subject"], color_discrete_sequence=["#8b5cf6"]), use_container_width=True)
 
+    col1, col2 = st.columns(2)
+    with col1:
+        start = st.date_input("From", value=None)
+    with col2:
+        end = st.date_input("To", value=None)
+    series = load_daily_series(str(start) if start else None, str(end) if end else None)
+    if series.empty:
+        st.info("No registrations in this period.")
+    else:
+        st.plotly_chart(px.line(series, x="day", y=["registrations", "revenue"], title="Registrations & Revenue over Time",
+                                markers=True), use_container_width=True)
+
+    with st.expander("Per-course figures"):
+        st.dataframe(by_course, use_container_width=True, hide_index=True)
+    with st.expander("📜 Registration history"):
+        st.caption("Registrations in the From/To range above, including archived years; newest 500 shown.")
+        try:
+            st.dataframe(load_registration_history(str(start) if start else None, str(end) if end else None),
+                         use_container_width=True, hide_index=True)
+        except ValueError as error:
+            st.warning(str(error))
+    with st.expander("🗄️ Archive old registrations"):
+        years = archived_years(db)
+        if years:
+            st.caption("Archived: " + ", ".join(f"{year} ({count:,})" for year, count in years))
+        st.caption("Moves registrations dated before the cutoff into one file per year. "
+                   "Counts, charts, history and exports still include them.")
+        cutoff = st.date_input("Archive registrations before", value=datetime(datetime.now().year - 1, 1, 1).date())
+        if st.button("🗄️ Archive"):
+            progress = st.empty()
+            moved = 0
+            for moved in archive_registrations(db, str(cutoff)):
+                progress.info(f"Archived {moved:,} registrations...")
+            success_message("archived", f"{moved:,} registration(s)")
+    if st.button("🔄 Rebuild Summaries"):
+        rebuild_summaries(db)
+        st.rerun()
+
+# ======================= GRADEBOOK =======================
+elif page == "Gradebook":
+    st.header("Gradebook")
+
+    ENTER, RESULTS, COHORT = "✍️ Enter Grades", "📊 Exam Results", "🎓 Cohort GPA"
+    section = section_tabs([ENTER, RESULTS, COHORT], key="gradebook_section")
+
+    if section in (ENTER, RESULTS):
+        exam_id = entity_picker(db, EXAMS, "Select Exam", key="gradebook_exam")
+        exam = get_record(db, EXAMS, exam_id) if exam_id else None
+
+    if section == ENTER and exam:
+        grades = load_exam_grades(exam_id)
+        st.caption(f"Marks out of {exam['max_marks']:g}. Edit in place, paste rows from a spreadsheet, "
+                   "or add student IDs at the bottom; deleted rows remove the grade.")
+        edited = st.data_editor(
+            grades, num_rows="dynamic", hide_index=True, use_container_width=True, disabled=["student"],
+            column_config={
+                "student_id": st.column_config.NumberColumn("Student ID", required=True, step=1),
+                "student": st.column_config.TextColumn("Student"),
+                "marks": st.column_config.NumberColumn("Marks", min_value=0.0, max_value=float(exam['max_marks'])),
+            },
+            key=f"gradebook_grid_{exam_id}")
+        if st.button("💾 Save Grades"):
+            edited = edited.dropna(subset=["student_id"])
+            duplicates = sorted(set(edited.loc[edited["student_id"].duplicated(), "student_id"].astype(int)))
+            unknown = unknown_students(db, edited["student_id"])
+            if duplicates:
+                st.error(f"Student ID(s) entered twice: {', '.join(map(str, duplicates))}")
+            elif unknown:
+                st.error(f"Unknown student ID(s): {', '.join(map(str, unknown))}")
+            else:
+                removed = set(grades["student_id"]) - set(edited["student_id"].astype(int))
+                save_exam_grades(db, exam_id, edited[["student_id", "marks"]].itertuples(index=False), removed)
+                success_message("saved", f"{len(edited)} grade(s)")
+
+    elif section == RESULTS and exam:
+        results, summary = exam_results(load_exam_grades(exam_id), exam['max_marks'])
+        if not summary["count"]:
+            st.info("No marks recorded for this exam yet.")
+        else:
+            col1, col2, col3, col4, col5 = st.columns(5)
+            col1.metric("Graded", f"{summary['count']:,}")
+            col2.metric("Average", f"{summary['mean']:.1f}")
+            col3.metric("Median", f"{summary['p50']:.1f}")
+            col4.metric("Std Dev", f"{summary['std']:.1f}")
+            col5.metric("Pass Rate", f"{summary['pass_rate']:.1f}%")
+            st.caption(" · ".join(f"P{q}: {summary[f'p{q}']:.1f}" for q in PERCENTILES)
+                       + f" · Min {summary['min']:g} · Max {summary['max']:g}")
+            col1, col2 = st.columns(2)
+            with col1:
+                st.plotly_chart(px.histogram(results, x="percent", nbins=20, title="Score Distribution (%)"),
+                                use_container_width=True)
+            with col2:
+                letters = results["letter"].value_counts().reindex(GRADE_LETTERS[::-1], fill_value=0)
+                st.plotly_chart(px.bar(x=letters.index, y=letters.values, labels={"x": "Grade", "y": "Students"},
+                                       title="Grade Distribution"), use_container_width=True)
+            st.dataframe(results.head(500), use_container_width=True, hide_index=True)
+            if len(results) > 500:
+                st.caption(f"Top 500 of {len(results):,} ranked students.")
+
+    elif section == COHORT:
+        gpa = load_cohort_gpa()
+        if gpa.empty:
+            st.info("No grades recorded yet.")
+        else:
+            col1, col2, col3 = st.columns(3)
+            col1.metric("Students Graded", f"{len(gpa):,}")
+            col2.metric("Mean GPA", f"{gpa['gpa'].mean():.2f}")
+            col3.metric("Median GPA", f"{gpa['gpa'].median():.2f}")
+            st.plotly_chart(px.histogram(gpa, x="gpa", nbins=16, title="GPA Distribution"), use_container_width=True)
+            st.dataframe(gpa.head(500), use_container_width=True, hide_index=True)
+            if len(gpa) > 500:
+                st.caption(f"Top 500 of {len(gpa):,} students by GPA.")
+
+# ======================= DATA EXPORT =======================
+elif page == "Data Export":
+    st.header("Data Export")
+
+    col1, col2 = st.columns([3, 1])
+    with col1:
+        source = EXPORT_SOURCES[st.selectbox("Dataset", list(EXPORT_SOURCES), format_func=lambda name: EXPORT_SOURCES[name].label)]
+    with col2:
+        fmt = st.radio("Format", list(FORMATS), horizontal=True)
+    extension, mime = FORMATS[fmt]
+    start = end = None
+    if source.history:
+        col1, col2 = st.columns(2)
+        with col1:
+            start = st.date_input("From", value=None, key="export_start")
+        with col2:
+            end = st.date_input("To", value=None, key="export_end")
+        start, end = (str(day) if day else None for day in (start, end))
+        st.caption(f"Includes archived registrations; at most {MAX_ATTACHED} archived years per export.")
+    # Checked up front: errors inside the deferred download would fail silently
+    try:
+        check_format(fmt)
+        rows = db.cache.get(('export_rows', source.name, start, end), sorted({table for _, table, _ in source.columns}),
+                            lambda: export_rows(db, source, start, end))
+    except ValueError as error:
+        st.error(str(error))
+    else:
+        if rows > DOWNLOAD_MAX_ROWS:
+            query = "&".join(f"{bound}={day}" for bound, day in (("start", start), ("end", end)) if day)
+            st.warning(f"{rows:,} rows is more than the {DOWNLOAD_MAX_ROWS:,} a browser download can hold. "
+                       "Narrow the date range, or stream it from the API (`python cli.py serve`): "
+                       f"`GET /exports/{source.name}?format={extension}" + (f"&{query}" if query else "") + "`")
+        else:
+            st.caption(f"{rows:,} rows. The file is generated when you click download.")
+            # A callable defers the export until the download is requested
+            st.download_button(f"📤 Download {source.label}", data=lambda: browser_download(db, source, fmt, start, end),
+                               file_name=f"{source.name}.{extension}", mime=mime, on_click="ignore")
 
+if show_profiler:
+    query_profile_panel(rerun)
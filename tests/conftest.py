@@ -0,0 +1,22 @@
+import pytest
+
+from database import Database
+from services import create_many
+
+
+@pytest.fixture
+def db(tmp_path):
+    db = Database(tmp_path / 'classroom.db')
+    yield db
+    db.close()
+
+
+@pytest.fixture
+def school(db):
+    """Two students, teachers and courses to register against, as {table: [ids]}."""
+    return {
+        'students': create_many(db, 'students', [{'name': f"Student {n}", 'email': f"student{n}@example.edu",
+                                                  'gender': 'Other', 'age': 20} for n in range(2)]),
+        'teachers': create_many(db, 'teachers', [{'name': f"Teacher {n}", 'subject': 'Physics'} for n in range(2)]),
+        'courses': create_many(db, 'courses', [{'name': f"Course {n}", 'fee': 100.0 * (n + 1)} for n in range(2)]),
+    }
@@ -0,0 +1,78 @@
+import http.client
+import json
+import threading
+from urllib.parse import quote
+
+import pytest
+
+import api
+
+
+@pytest.fixture
+def client(db):
+    server = api.make_server(db, port=0)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    conn = http.client.HTTPConnection(*server.server_address, timeout=10)
+    yield conn
+    conn.close()
+    server.shutdown()
+    server.server_close()
+
+
+def call(conn, method, path, body=None):
+    conn.request(method, path, body=None if body is None else json.dumps(body))
+    response = conn.getresponse()
+    return response.status, json.loads(response.read())
+
+
+def assert_next_request_is_clean(conn):
+    assert call(conn, 'GET', '/health') == (200, {'status': 'ok'})
+
+
+def test_requests_reuse_the_connection(client):
+    status, result = call(client, 'POST', '/departments', {'name': 'Physics'})
+    assert status == 201
+    sock = client.sock
+    assert call(client, 'GET', f"/departments/{result['ids'][0]}") == (200, {'id': result['ids'][0], 'name': 'Physics'})
+    assert client.sock is sock
+
+
+@pytest.mark.parametrize('method, path, status', [
+    ('POST', '/nosuchtable', 404),
+    ('PUT', '/exams/abc/grades', 400),
+    ('GET', '/students/1', 404),
+])
+def test_unread_body_does_not_leak_into_the_next_request(client, method, path, status):
+    assert call(client, method, path, {'name': 'x'})[0] == status
+    assert_next_request_is_clean(client)
+
+
+def test_oversized_body_is_rejected_without_reading_it(client, monkeypatch):
+    monkeypatch.setattr(api, 'MAX_BODY_BYTES', 10)
+    assert call(client, 'POST', '/departments', {'name': 'A long department name'})[0] == 413
+    assert_next_request_is_clean(client)
+
+
+def test_negative_content_length_is_rejected(client):
+    client.putrequest('POST', '/departments')
+    client.putheader('Content-Length', '-1')
+    client.endheaders(b'{"name": "x"}')
+    response = client.getresponse()
+    assert response.status == 400 and json.loads(response.read()) == {'error': 'negative Content-Length'}
+    assert_next_request_is_clean(client)
+
+
+@pytest.mark.parametrize('limit', ['0', '-2', 'many'])
+def test_page_limit_must_be_positive(client, limit):
+    status, result = call(client, 'GET', f"/departments?limit={limit}")
+    assert status == 400, result
+
+
+def test_pages_follow_the_cursor(client):
+    call(client, 'POST', '/departments', [{'name': f"Department {n}"} for n in range(5)])
+    status, page = call(client, 'GET', '/departments?limit=2')
+    assert status == 200 and len(page['records']) == 2
+    status, rest = call(client, 'GET', f"/departments?limit=10&after={quote(json.dumps(page['next']))}")
+    assert [record['id'] for record in page['records'] + rest['records']] == list(range(1, 6))
+    assert rest['next'] is None
@@ -0,0 +1,95 @@
+import pytest
+
+import archive
+from analytics import rebuild_summaries
+from archive import MAX_ATTACHED, archive_file, archive_registrations, archived_years, history, registration_history
+from exporter import REGISTRATIONS_REPORT, iter_rows
+from migrations import SUMMARY_TABLES
+from services import register_many
+from stats import read_stats, recompute_stats
+
+YEARS = range(2019, 2025)
+
+
+@pytest.fixture
+def registrations(db, school):
+    """Three registrations a year, 2019-2024, spread over the school's students, teachers and courses."""
+    rows = [{'student_id': school['students'][n % 2], 'teacher_id': school['teachers'][n // 2 % 2],
+             'course_id': school['courses'][year % 2], 'registration_date': f"{year}-0{n + 1}-15"}
+            for year in YEARS for n in range(3)]
+    register_many(db, rows)
+    return rows
+
+
+def snapshot(db):
+    """The registrations counter and every summary table."""
+    return read_stats(db)['registrations'], {table: db.fetchall(f"SELECT * FROM {table} ORDER BY 1, 2")
+                                             for table in SUMMARY_TABLES}
+
+
+def live_dates(db):
+    return [day for (day,) in db.fetchall('SELECT registration_date FROM registrations ORDER BY registration_date')]
+
+
+def test_moves_rows_before_the_cutoff_in_batches(db, registrations):
+    progress = list(archive_registrations(db, '2022-01-01', batch_rows=2))
+    assert progress == [2, 4, 6, 8, 9]
+    assert live_dates(db) == sorted(row['registration_date'] for row in registrations
+                                    if row['registration_date'] >= '2022')
+    assert archived_years(db) == [(2019, 3), (2020, 3), (2021, 3)]
+    assert all(archive_file(db, year).exists() for year in (2019, 2020, 2021))
+    assert list(archive_registrations(db, '2022-01-01')) == []
+
+
+def test_counters_and_summaries_keep_archived_rows(db, registrations):
+    before = snapshot(db)
+    list(archive_registrations(db, '2023-01-01', batch_rows=4))
+    assert snapshot(db) == before
+    recompute_stats(db)
+    rebuild_summaries(db)
+    assert snapshot(db) == before
+
+
+def test_rerun_after_an_interrupted_move_does_not_double_count(db, registrations, monkeypatch):
+    before = snapshot(db)
+
+    def crash(conn, year, ids):
+        raise RuntimeError('interrupted')
+    # The batch reaches its archive file but is never deleted from the live table
+    with monkeypatch.context() as patch:
+        patch.setattr(archive, '_move', crash)
+        with pytest.raises(RuntimeError):
+            list(archive_registrations(db, '2021-01-01', batch_rows=2))
+    assert len(live_dates(db)) == len(registrations)
+
+    assert list(archive_registrations(db, '2021-01-01', batch_rows=2))[-1] == 6
+    assert archived_years(db) == [(2019, 3), (2020, 3)]
+    assert len(registration_history(db, limit=100)) == len(registrations)
+    recompute_stats(db)
+    rebuild_summaries(db)
+    assert snapshot(db) == before
+
+
+def test_history_unions_live_and_archived_years(db, registrations):
+    list(archive_registrations(db, '2022-01-01'))
+    everything = registration_history(db, limit=100)
+    assert sorted(everything['registration_date']) == sorted(row['registration_date'] for row in registrations)
+    ranged = registration_history(db, '2020-02-01', '2022-02-28', limit=100)
+    assert sorted(ranged['registration_date']) == [
+        '2020-02-15', '2020-03-15', '2021-01-15', '2021-02-15', '2021-03-15', '2022-01-15', '2022-02-15']
+    with history(db, '2021-01-01', '2021-12-31') as conn:
+        attached = [name for _, name, _ in conn.execute('PRAGMA database_list')]
+    assert attached == ['main', 'temp', 'archive_2021']
+    report = [row for rows in iter_rows(db, REGISTRATIONS_REPORT, start='2019-01-01', end='2019-12-31')
+              for row in rows]
+    assert [row[1] for row in report] == ['2019-01-15', '2019-02-15', '2019-03-15']
+
+
+def test_history_refuses_more_years_than_sqlite_can_attach(db, school):
+    years = range(2000, 2001 + MAX_ATTACHED)
+    register_many(db, [{'student_id': school['students'][0], 'teacher_id': school['teachers'][0],
+                        'course_id': school['courses'][0], 'registration_date': f"{year}-06-01"} for year in years])
+    list(archive_registrations(db, '2100-01-01'))
+    with pytest.raises(ValueError, match=f"narrow it to {MAX_ATTACHED}"):
+        registration_history(db)
+    assert len(registration_history(db, f"{years[1]}-01-01")) == MAX_ATTACHED
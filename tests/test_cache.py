@@ -0,0 +1,70 @@
+import sqlite3
+
+import pytest
+
+from analytics import rebuild_summaries
+from database import Database
+from services import create, register
+
+
+@pytest.fixture
+def replica(db):
+    """A second Database on the same file, as another app replica would open it."""
+    other = Database(db.path)
+    yield other
+    other.close()
+
+
+def counting(db, *tables):
+    calls = []
+
+    @db.cache.memoize(*tables)
+    def departments():
+        calls.append(1)
+        return db.fetchall('SELECT name FROM departments ORDER BY id')
+    return departments, calls
+
+
+def test_reads_are_served_from_the_cache_until_their_table_changes(db):
+    departments, calls = counting(db, 'departments')
+    assert departments() == departments() == []
+    assert len(calls) == 1
+    create(db, 'courses', {'name': 'Physics', 'fee': 100})
+    departments()
+    assert len(calls) == 1
+    create(db, 'departments', {'name': 'Science'})
+    assert departments() == [('Science',)] and len(calls) == 2
+
+
+def test_writes_from_another_replica_invalidate(db, replica):
+    departments, calls = counting(db, 'departments')
+    departments()
+    create(replica, 'departments', {'name': 'Science'})
+    assert departments() == [('Science',)] and len(calls) == 2
+
+
+def test_writes_from_a_plain_connection_invalidate(db):
+    departments, calls = counting(db, 'departments')
+    departments()
+    conn = sqlite3.connect(db.path)
+    with conn:
+        conn.execute("INSERT INTO departments (name) VALUES ('Arts')")
+    conn.close()
+    assert departments() == [('Arts',)] and len(calls) == 2
+
+
+def test_rebuilt_summaries_invalidate_registration_reads(db, school, replica):
+    @db.cache.memoize('registrations')
+    def by_course():
+        return db.fetchall('SELECT course_id, registrations FROM registrations_by_course ORDER BY 1')
+    course_id = school['courses'][0]
+    register(db, school['students'][0], school['teachers'][0], course_id, '2024-01-01')
+    # Drift made behind the triggers' back is cached as read...
+    conn = sqlite3.connect(db.path)
+    with conn:
+        conn.execute('UPDATE registrations_by_course SET registrations = 5')
+    conn.close()
+    assert by_course() == [(course_id, 5)]
+    # ...until a rebuild, even from another replica, bumps the versions
+    rebuild_summaries(replica)
+    assert by_course() == [(course_id, 1)]
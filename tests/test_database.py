@@ -0,0 +1,29 @@
+import sqlite3
+
+import pytest
+
+import database
+from database import Database
+
+
+@pytest.fixture
+def db(tmp_path, monkeypatch):
+    monkeypatch.setattr(database, 'BUSY_TIMEOUT_MS', 100)
+    db = Database(tmp_path / 'classroom.db')
+    yield db
+    db.close()
+
+
+def test_queued_write_fails_instead_of_hanging_while_another_connection_holds_the_lock(db):
+    other = sqlite3.connect(db.path, isolation_level=None)
+    other.execute('BEGIN IMMEDIATE')
+    try:
+        future = db.submit("INSERT INTO departments (name) VALUES ('Physics')")
+        with pytest.raises(sqlite3.OperationalError):
+            future.result(timeout=10)
+    finally:
+        other.execute('ROLLBACK')
+        other.close()
+    # The writer thread survives and later writes go through
+    db.execute("INSERT INTO departments (name) VALUES ('Physics')")
+    assert db.scalar('SELECT COUNT(*) FROM departments') == 1
@@ -0,0 +1,42 @@
+import csv
+import io
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+from streamlit.runtime.download_data_util import convert_data_to_bytes_and_infer_mime
+
+from database import Database
+from exporter import EXPORT_SOURCES, REGISTRATIONS_REPORT, browser_download, iter_rows
+from services import create_many, register
+
+
+@pytest.mark.parametrize('fmt', ['CSV', 'Parquet'])
+def test_browser_download_is_data_st_download_button_accepts(db, school, fmt):
+    if fmt == 'Parquet':
+        pytest.importorskip('pyarrow')
+    data = browser_download(db, EXPORT_SOURCES['students'], fmt)
+    converted, _ = convert_data_to_bytes_and_infer_mime(data, unsupported_error=TypeError(type(data)))
+    assert converted == data and len(converted) > 0
+
+
+def test_registrations_report_csv_joins_names(db, school):
+    register(db, school['students'][0], school['teachers'][1], school['courses'][0], '2024-03-01')
+    rows = list(csv.reader(io.StringIO(browser_download(db, REGISTRATIONS_REPORT, 'CSV').decode())))
+    assert rows[0][:2] == ['registration_id', 'registration_date']
+    assert rows[1][1:4] == ['2024-03-01', str(school['students'][0]), 'Student 0']
+
+
+def test_a_paused_export_does_not_hold_a_pooled_reader(tmp_path):
+    db = Database(tmp_path / 'one_reader.db', readers=1)
+    try:
+        create_many(db, 'departments', [{'name': f"Department {n}"} for n in range(3)])
+        rows = iter_rows(db, EXPORT_SOURCES['departments'], chunk_rows=1)
+        next(rows)
+        pool = ThreadPoolExecutor(1)
+        try:
+            assert pool.submit(db.scalar, 'SELECT COUNT(*) FROM departments').result(timeout=5) == 3
+        finally:
+            rows.close()
+            pool.shutdown()
+    finally:
+        db.close()
@@ -0,0 +1,62 @@
+import io
+from datetime import date, datetime
+
+import pytest
+
+from importer import import_file
+
+
+def load(db, table, text, filename='rows.csv'):
+    file = io.BytesIO(text.encode()) if isinstance(text, str) else text
+    *_, report = import_file(db, table, file, filename)
+    return report
+
+
+def registrations_csv(school, dates):
+    ids = f"{school['students'][0]},{school['teachers'][0]},{school['courses'][0]}"
+    return "student_id,teacher_id,course_id,registration_date\n" + "".join(f"{ids},{day}\n" for day in dates)
+
+
+def test_registration_dates_are_normalised(db, school):
+    report = load(db, 'registrations', registrations_csv(school, ['2024-01-05', '2024-01-06 00:00:00', '2024-1-7', '']))
+    assert (report.inserted, report.failed) == (4, 0)
+    assert [day for (day,) in db.fetchall('SELECT registration_date FROM registrations ORDER BY id')] == [
+        '2024-01-05', '2024-01-06', '2024-01-07', date.today().isoformat()]
+
+
+def test_unparsable_registration_dates_are_reported_per_row(db, school):
+    report = load(db, 'registrations', registrations_csv(school, ['2024-01-05', 'not a date', '2024-02-30']))
+    assert report.inserted == 1
+    assert [row for row, _ in report.errors] == [3, 4]
+    assert all('registration_date' in message for _, message in report.errors)
+
+
+def test_excel_date_cells(db, school):
+    openpyxl = pytest.importorskip('openpyxl')
+    workbook = openpyxl.Workbook()
+    sheet = workbook.active
+    sheet.append(['student_id', 'teacher_id', 'course_id', 'registration_date'])
+    sheet.append([school['students'][0], school['teachers'][0], school['courses'][0], datetime(2024, 1, 5)])
+    file = io.BytesIO()
+    workbook.save(file)
+    file.seek(0)
+    assert load(db, 'registrations', file, 'rows.xlsx').inserted == 1
+    assert db.scalar('SELECT registration_date FROM registrations') == '2024-01-05'
+
+
+def test_student_rules(db):
+    report = load(db, 'students', "name,email,gender,age\n"
+                                  "A,a@example.edu,Male,20\n"
+                                  "B,b@example.edu,,21\n"
+                                  "C,c@example.edu,male,22\n"
+                                  "D,d@example.edu,Other,0\n"
+                                  "E,e@example.edu,Female,2.5\n")
+    assert report.inserted == 1
+    assert [message for _, message in report.errors] == [
+        'missing gender', 'gender must be one of Male, Female, Other', 'age must be at least 1',
+        'age must be a whole number']
+
+
+def test_course_fees_may_have_cents_but_not_be_negative(db):
+    report = load(db, 'courses', "name,fee\nPhysics,99.50\nChemistry,-1\n")
+    assert report.inserted == 1 and report.errors == [(3, 'fee must be at least 0')]
@@ -0,0 +1,42 @@
+import pytest
+
+from services import create, get, register, update
+
+
+@pytest.mark.parametrize('table, record', [
+    ('courses', {'name': 'Bad', 'fee': 'abc'}),
+    ('courses', {'name': 'Bad', 'fee': -1}),
+    ('courses', {'name': 'Bad'}),
+    ('exams', {'exam_name': 'Bad', 'exam_date': '2025-01-01', 'start_time': '09:00', 'end_time': '10:00',
+               'max_marks': 0}),
+    ('exams', {'exam_name': 'Bad', 'exam_date': '2025-01-01', 'start_time': '09:00', 'end_time': '10:00',
+               'max_marks': '100'}),
+    ('students', {'name': 'Bad', 'email': 'bad@example.edu'}),
+    ('students', {'name': 'Bad', 'email': 'bad@example.edu', 'gender': 'Other', 'age': 0}),
+])
+def test_create_rejects_values_the_forms_cannot_hold(db, table, record):
+    with pytest.raises(ValueError):
+        create(db, table, record)
+    assert db.scalar(f"SELECT COUNT(*) FROM {table}") == 0
+
+
+def test_update_checks_only_the_changed_fields(db):
+    course_id = create(db, 'courses', {'name': 'Physics', 'fee': 120})
+    assert update(db, 'courses', course_id, {'name': 'Physics I'})['fee'] == 120
+    with pytest.raises(ValueError):
+        update(db, 'courses', course_id, {'fee': 'free'})
+    assert get(db, 'courses', course_id)['fee'] == 120
+
+
+def test_exam_max_marks_defaults_to_100(db):
+    exam_id = create(db, 'exams', {'exam_name': 'Final', 'exam_date': '2025-01-01',
+                                   'start_time': '09:00', 'end_time': '10:00'})
+    assert get(db, 'exams', exam_id)['max_marks'] == 100
+
+
+def test_registration_date_is_checked_and_normalised(db, school):
+    ids = school['students'][0], school['teachers'][0], school['courses'][0]
+    with pytest.raises(ValueError, match='registration_date'):
+        register(db, *ids, 'not a date')
+    registration_id = register(db, *ids, '20240105')
+    assert db.scalar('SELECT registration_date FROM registrations WHERE id = ?', (registration_id,)) == '2024-01-05'
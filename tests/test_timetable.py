@@ -0,0 +1,56 @@
+import random
+
+import pytest
+
+from services import Conflict, create, update
+from timetable import timetable_clashes
+
+
+def exam(name, start, end, exam_date='2025-06-02'):
+    return {'exam_name': name, 'exam_date': exam_date, 'start_time': start, 'end_time': end}
+
+
+def test_exams_may_touch_but_not_overlap(db):
+    create(db, 'exams', exam('Physics', '09:00', '11:00'))
+    create(db, 'exams', exam('Chemistry', '11:00', '12:00'))
+    create(db, 'exams', exam('Biology', '08:00', '09:00'))
+    create(db, 'exams', exam('History', '10:00', '11:00', exam_date='2025-06-03'))
+    with pytest.raises(Conflict, match=r'Physics \(09:00-11:00\)'):
+        create(db, 'exams', exam('English', '10:00', '10:45'))
+    # Spanning several exams: the latest-starting one is reported
+    with pytest.raises(Conflict, match='Chemistry'):
+        create(db, 'exams', exam('English', '08:30', '12:30'))
+    assert db.scalar('SELECT COUNT(*) FROM exams') == 4
+
+
+def test_an_exam_does_not_clash_with_itself(db):
+    exam_id = create(db, 'exams', exam('Physics', '09:00', '11:00'))
+    assert update(db, 'exams', exam_id, {'start_time': '09:30'})['start_time'] == '09:30'
+    create(db, 'exams', exam('Chemistry', '11:00', '12:00'))
+    with pytest.raises(Conflict, match='Chemistry'):
+        update(db, 'exams', exam_id, {'end_time': '11:30'})
+
+
+def test_sweep_finds_every_exam_that_overlaps_an_earlier_one(db):
+    # Written straight to the table, as free-text imports and old data can be
+    rng = random.Random(7)
+    rows = []
+    for n in range(300):
+        start = rng.randrange(8 * 60, 17 * 60, 15)
+        end = start + rng.choice((30, 60, 90, 120, 180))
+        rows.append((f"Exam {n}", f"2025-06-0{rng.randrange(1, 4)}", f"{start // 60:02d}:{start % 60:02d}",
+                     f"{end // 60:02d}:{end % 60:02d}"))
+    db.executemany('''INSERT INTO exams (exam_name, exam_date, start_time, end_time, exam_time)
+        VALUES (?, ?, ?, ?, '')''', rows)
+    exams = db.fetchall('SELECT id, exam_date, start_time, end_time FROM exams')
+
+    def overlaps_earlier(exam_id, day, start, end):
+        return any(other_day == day and (other_start, other_id) < (start, exam_id) and other_end > start
+                   for other_id, other_day, other_start, other_end in exams)
+    expected = {exam_id for exam_id, *slot in exams if overlaps_earlier(exam_id, *slot)}
+
+    clashes = timetable_clashes(db)
+    assert expected and set(clashes['exam_id']) == expected
+    assert clashes['exam_id'].is_unique
+    assert (clashes['start_time'] < clashes['other_end']).all()
+    assert (clashes['other_start'] <= clashes['start_time']).all()
@@ -0,0 +1,77 @@
+import pandas as pd
+
+TIME_FORMAT = '%H:%M'
+CLASH_COLUMNS = ['exam_date', 'exam_id', 'exam', 'start_time', 'end_time',
+                 'clashes_with_id', 'clashes_with', 'other_start', 'other_end']
+
+# Exams on one date must not overlap: [start, end) intervals, so an exam may
+# start at the minute the previous one ends. Times are zero-padded 'HH:MM'
+# text, which sorts and compares in time order.
+
+
+def time_range(start, end):
+    return f"{start}-{end}"
+
+
+def _previous_exam(conn, exam_date, start_time, end_time, exclude_id=None):
+    # While the timetable is clash-free, intervals on a date are disjoint, so
+    # ordering by start also orders by end: the exam starting latest before
+    # `end_time` is the only one that can overlap. One seek on
+    # idx_exams_date_start - O(log n) whatever the size of the timetable.
+    row = conn.execute('''SELECT id, exam_name, start_time, end_time FROM exams
+        WHERE exam_date = ? AND start_time < ? AND id IS NOT ?
+        ORDER BY start_time DESC LIMIT 1''', (exam_date, end_time, exclude_id)).fetchone()
+    if row and row[3] > start_time:
+        return dict(zip(('id', 'exam_name', 'start_time', 'end_time'), row))
+    return None
+
+
+def write_exam(conn, exam_id, exam_name, exam_date, start_time, end_time, max_marks):
+    """Insert (exam_id None) or update an exam on the writer connection unless it clashes.
+
+    Returns (exam id, None) once written, or (exam_id, clashing exam). The
+    clash check and the write share one write transaction, so two users
+    cannot book the same slot at once.
+    """
+    clash = _previous_exam(conn, exam_date, start_time, end_time, exam_id)
+    if clash:
+        return exam_id, clash
+    values = (exam_name, exam_date, start_time, end_time, time_range(start_time, end_time), max_marks)
+    if exam_id is None:
+        cursor = conn.execute('''INSERT INTO exams (exam_name, exam_date, start_time, end_time, exam_time, max_marks)
+            VALUES (?, ?, ?, ?, ?, ?)''', values)
+        return cursor.lastrowid, None
+    conn.execute('''UPDATE exams SET exam_name = ?, exam_date = ?, start_time = ?, end_time = ?,
+        exam_time = ?, max_marks = ? WHERE id = ?''', values + (exam_id,))
+    return exam_id, None
+
+
+def timetable_clashes(db):
+    """Every exam that overlaps an earlier-starting exam on the same date.
+
+    A sorted sweep: exams are read in (date, start) order straight off
+    idx_exams_date_start, and each is compared with the running latest-ending
+    exam of its day - O(n log n) for the sort, O(n) for the sweep. Each
+    clashing exam is reported once, against the exam it runs into.
+    """
+    clashes = []
+    day = latest = None
+    chunks = db.iter_chunks('''SELECT id, exam_name, exam_date, start_time, end_time FROM exams
+        WHERE start_time IS NOT NULL AND end_time IS NOT NULL
+        ORDER BY exam_date, start_time''')
+    for rows in chunks:
+        for exam_id, name, exam_date, start_time, end_time in rows:
+            if exam_date != day:
+                day, latest = exam_date, None
+            if latest and start_time < latest[4]:
+                clashes.append((exam_date, exam_id, name, start_time, end_time,
+                                latest[0], latest[1], latest[3], latest[4]))
+            if latest is None or end_time > latest[4]:
+                latest = (exam_id, name, exam_date, start_time, end_time)
+    return pd.DataFrame(clashes, columns=CLASH_COLUMNS)
+
+
+def unscheduled_exams(db):
+    """Exams without a structured start and end (free-text times from before migration 9)."""
+    return db.query('''SELECT id, exam_name, exam_date, exam_time FROM exams
+        WHERE start_time IS NULL OR end_time IS NULL ORDER BY exam_date, id''')